@@ -0,0 +1,109 @@
+# ai/presence.py
+
+import math
+import threading
+import time
+
+# Trọng số mặc định cho từng nguồn tín hiệu
+DEFAULT_WEIGHTS = {
+    "motion": 3.0,
+    "pir": 5.0,
+    "rfid": 3.0,
+    "yolo": 10.0,
+}
+
+
+class PresenceEngine:
+    """
+    Máy trạng thái hiện diện của thú cưng + điểm hành vi (0–100).
+
+    Mỗi kênh (motion / PIR / RFID / YOLO) giữ một EMA theo thời gian với
+    hằng số `window` giây, nên điểm tự giảm dần khi không còn hoạt động.
+    Trạng thái "có pet" dùng hysteresis: vào khi điểm >= enter_score (hoặc
+    YOLO xác minh), chỉ ra khi điểm < leave_score liên tục leave_hold giây.
+    Mọi thao tác là O(1).
+    """
+
+    def __init__(self, weights=None, window=30.0, enter_score=30.0,
+                 leave_score=10.0, leave_hold=10.0, pulse_gain=0.5):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights:
+            self.weights.update(weights)
+
+        self.window = float(window)
+        self.enter_score = float(enter_score)
+        self.leave_score = float(leave_score)
+        self.leave_hold = float(leave_hold)
+        self.pulse_gain = float(pulse_gain)
+
+        now = time.monotonic()
+        # channel -> [ema, giá trị đang giữ, thời điểm cập nhật]
+        self._channels = {name: [0.0, 0.0, now] for name in self.weights}
+        self._total_weight = sum(self.weights.values()) or 1.0
+
+        self.present = False
+        self._below_since = None
+        self._lock = threading.Lock()
+
+    # ------------ INTERNAL ------------ #
+    def _decay(self, name, now):
+        ch = self._channels[name]
+        dt = now - ch[2]
+        if dt > 0:
+            k = math.exp(-dt / self.window)
+            ch[0] = ch[1] + (ch[0] - ch[1]) * k
+            ch[2] = now
+        return ch
+
+    def _score(self, now):
+        total = 0.0
+        for name, w in self.weights.items():
+            total += w * self._decay(name, now)[0]
+        return 100.0 * total / self._total_weight
+
+    def _update_state(self, now, confirmed=False):
+        score = self._score(now)
+
+        if not self.present:
+            if confirmed or score >= self.enter_score:
+                self.present = True
+                self._below_since = None
+        elif score < self.leave_score:
+            if self._below_since is None:
+                self._below_since = now
+            elif now - self._below_since >= self.leave_hold:
+                self.present = False
+                self._below_since = None
+        else:
+            self._below_since = None
+
+        return score
+
+    # ------------ PUBLIC API ------------ #
+    def observe(self, name, value, now=None):
+        """Cập nhật kênh dạng mức (motion, PIR) với giá trị 0..1."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            ch = self._decay(name, now)
+            ch[1] = max(0.0, min(1.0, float(value)))
+            return self._update_state(now)
+
+    def pulse(self, name, strength=1.0, now=None):
+        """Ghi nhận sự kiện rời rạc (RFID quét thẻ, YOLO xác minh pet)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            ch = self._decay(name, now)
+            ch[0] += (1.0 - ch[0]) * self.pulse_gain * max(0.0, min(1.0, strength))
+            ch[1] = 0.0
+            return self._update_state(now, confirmed=(name == "yolo"))
+
+    def score(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._update_state(now)
+
+    def snapshot(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            score = self._update_state(now)
+            return {"present": self.present, "behavior_score": int(round(score))}
@@ -0,0 +1,52 @@
+# ai/profiles.py
+#
+# Profile suy luận YOLO: cố định kích thước input, class, max_det, precision và
+# IoU của NMS. Chọn theo từng camera qua settings ("detect_profile").
+
+from dataclasses import dataclass
+
+try:
+    from ultralytics.cfg import DEFAULT_CFG_DICT
+except ImportError:  # ultralytics cũ không có module cfg
+    DEFAULT_CFG_DICT = {}
+
+# ultralytics >= 8.4 thay `half` (deprecated, cảnh báo mỗi lần predict) bằng `quantize`
+HAS_QUANTIZE = "quantize" in DEFAULT_CFG_DICT
+
+
+@dataclass(frozen=True, slots=True)
+class DetectionProfile:
+    imgsz: int = 640
+    classes: tuple | None = None   # None -> dùng pet_classes trong settings
+    max_det: int = 300
+    precision: int = 32            # 16 = FP16, chỉ có tác dụng trên GPU
+    iou: float = 0.7               # ngưỡng IoU của NMS
+
+    def predict_kwargs(self, class_ids):
+        kwargs = {
+            "imgsz": self.imgsz,
+            "classes": class_ids,
+            "max_det": self.max_det,
+            "iou": self.iou,
+        }
+        if self.precision == 16:
+            kwargs["quantize" if HAS_QUANTIZE else "half"] = 16 if HAS_QUANTIZE else True
+        return kwargs
+
+    def to_dict(self):
+        return {
+            "imgsz": self.imgsz,
+            "classes": list(self.classes) if self.classes is not None else None,
+            "max_det": self.max_det,
+            "precision": self.precision,
+            "iou": self.iou,
+        }
+
+
+# "accurate" = tham số mặc định của ultralytics (hành vi cũ)
+PROFILES = {
+    "accurate": DetectionProfile(),
+    "balanced": DetectionProfile(imgsz=416, max_det=10, iou=0.6),
+    "fast": DetectionProfile(imgsz=320, max_det=5, precision=16, iou=0.5),
+}
+DEFAULT_PROFILE = "accurate"
@@ -0,0 +1,113 @@
+# assets.py
+#
+# Nén response: negotiate Accept-Encoding, gzip (luôn có) / brotli (tùy chọn),
+# và static file có hash nội dung trong URL + bản nén tính sẵn.
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # Brotli là tùy chọn
+    brotli = None
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding, available=ENCODINGS):
+    """Encoding tốt nhất client chấp nhận (theo thứ tự `available`), hoặc None."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+
+    for encoding in available:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(data, encoding, best=False):
+    """best=True cho file tĩnh (nén 1 lần), False cho response động (nhanh)."""
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+
+
+class StaticAssets:
+    """
+    Static file phục vụ qua URL có hash nội dung (`css/style.3f2a1b9c0d.css`)
+    -> cache 1 năm (immutable), đổi nội dung thì URL đổi. Bản gzip / brotli
+    được nén sẵn 1 lần; file sửa trên đĩa (mtime đổi) thì tính lại.
+    """
+
+    def __init__(self, root, prefix="/assets", min_size=512):
+        self.root = root
+        self.prefix = prefix
+        self.min_size = min_size
+        self._entries = {}   # tên gốc -> entry
+        self._hashed = {}    # tên có hash -> tên gốc
+        self._lock = threading.Lock()
+
+        for folder, _, files in os.walk(root):
+            for name in files:
+                self._entry(os.path.relpath(os.path.join(folder, name), root).replace(os.sep, "/"))
+
+    def _entry(self, name):
+        path = os.path.join(self.root, name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        entry = self._entries.get(name)
+        if entry is not None and entry["mtime"] == mtime:
+            return entry
+
+        with open(path, "rb") as f:
+            raw = f.read()
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{hashlib.sha256(raw).hexdigest()[:10]}{ext}"
+
+        bodies = {None: raw}
+        if len(raw) >= self.min_size:
+            for encoding in ENCODINGS:
+                packed = compress(raw, encoding, best=True)
+                if len(packed) < len(raw):
+                    bodies[encoding] = packed
+
+        entry = {
+            "mtime": mtime,
+            "hashed": hashed,
+            "mimetype": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "bodies": bodies,
+        }
+        with self._lock:
+            old = self._entries.get(name)
+            if old is not None:
+                self._hashed.pop(old["hashed"], None)
+            self._entries[name] = entry
+            self._hashed[hashed] = name
+        return entry
+
+    def url(self, name):
+        """URL có hash cho template; file không tồn tại -> /static/<name>."""
+        entry = self._entry(name)
+        if entry is None:
+            return f"/static/{name}"
+        return f"{self.prefix}/{entry['hashed']}"
+
+    def get(self, hashed, accept_encoding=""):
+        """(body, encoding hoặc None, mimetype), None nếu hash không còn đúng."""
+        name = self._hashed.get(hashed)
+        entry = self._entry(name) if name is not None else None
+        if entry is None or entry["hashed"] != hashed:
+            return None
+
+        encoding = negotiate(accept_encoding, [e for e in ENCODINGS if e in entry["bodies"]])
+        return entry["bodies"][encoding], encoding, entry["mimetype"]
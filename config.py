@@ -0,0 +1,151 @@
+# config.py
+#
+# Ngưỡng detector chỉnh được lúc chạy: đọc từ file JSON + API /settings,
+# thay đổi có hiệu lực ngay mà không phải khởi động lại camera_loop.
+
+import json
+import math
+import os
+import threading
+from dataclasses import dataclass, asdict, fields, replace
+
+from ai.profiles import PROFILES, DEFAULT_PROFILE
+
+
+@dataclass(frozen=True, slots=True)
+class DetectorSettings:
+    """Bản cấu hình bất biến; đổi cấu hình = thay cả object."""
+
+    pet_threshold: float = 0.25           # conf tối thiểu của YOLO
+    pet_classes: tuple = ("dog", "cat")   # nhãn COCO được coi là pet
+    motion_diff_threshold: int = 25       # chênh lệch mức xám (0-255)
+    motion_min_area: int = 800            # px², theo tọa độ frame gốc
+    no_pet_cooldown: float = 5.0          # giây giữa 2 log "không thấy pet"
+    detect_profile: str = DEFAULT_PROFILE  # tên trong ai.profiles.PROFILES
+
+    def to_dict(self):
+        data = asdict(self)
+        data["pet_classes"] = list(self.pet_classes)
+        return data
+
+
+LIMITS = {
+    "pet_threshold": (0.0, 1.0),
+    "motion_diff_threshold": (1, 255),
+    "motion_min_area": (0, None),
+    "no_pet_cooldown": (0.0, None),
+}
+
+
+def _number(key, value, kind):
+    """Ép số chặt: không nhận bool, NaN / inf, hay số lẻ cho trường int."""
+    name = "số nguyên" if kind is int else "số"
+    if isinstance(value, bool):
+        raise ValueError(f"{key} phải là {name}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} phải là {name}") from None
+    if not math.isfinite(number):
+        raise ValueError(f"{key} phải là {name} hữu hạn")
+    if kind is int:
+        if not number.is_integer():
+            raise ValueError(f"{key} phải là {name}")
+        return int(number)
+    return number
+
+
+def parse_settings(data, base=None, known_classes=None):
+    """
+    Tạo DetectorSettings mới từ `base` + các khóa trong `data` (JSON hoặc form:
+    giá trị dạng chuỗi được ép kiểu, pet_classes nhận list hoặc "dog,cat").
+    Khóa lạ / giá trị sai -> ValueError.
+    """
+    base = base or DetectorSettings()
+    types = {f.name: f.type for f in fields(DetectorSettings)}
+    changes = {}
+
+    for key, value in data.items():
+        if key not in types:
+            raise ValueError(f"không có thiết lập '{key}'")
+
+        if key == "pet_classes":
+            if isinstance(value, str):
+                value = value.split(",")
+            value = tuple(str(v).strip() for v in value if str(v).strip())
+            if not value:
+                raise ValueError("pet_classes không được rỗng")
+            if known_classes is not None:
+                unknown = [v for v in value if v not in known_classes]
+                if unknown:
+                    raise ValueError(f"nhãn không có trong model: {', '.join(unknown)}")
+        elif key == "detect_profile":
+            value = str(value)
+            if value not in PROFILES:
+                raise ValueError(f"detect_profile phải là 1 trong: {', '.join(PROFILES)}")
+        else:
+            value = _number(key, value, types[key])
+            low, high = LIMITS[key]
+            if (low is not None and value < low) or (high is not None and value > high):
+                raise ValueError(f"{key} ngoài khoảng [{low}, {high if high is not None else '∞'}]")
+
+        changes[key] = value
+
+    return replace(base, **changes)
+
+
+class SettingsStore:
+    """
+    Giữ DetectorSettings hiện tại (đọc không cần khóa: `store.current`).
+    update() kiểm tra rồi ghi file (ghi tạm + rename); reload() đọc lại file
+    nếu mtime đổi -> sửa tay file JSON cũng có hiệu lực khi đang chạy.
+    """
+
+    def __init__(self, path, known_classes=None):
+        self.path = path
+        self.known_classes = known_classes
+        self.current = DetectorSettings()
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self):
+        """Đọc lại file nếu đã đổi; file lỗi thì giữ cấu hình cũ. True nếu có thay đổi."""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+
+        with self._lock:
+            self._mtime = mtime
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    new = parse_settings(json.load(f), known_classes=self.known_classes)
+            except (OSError, ValueError) as e:  # JSONDecodeError là ValueError
+                print(f"⚠️ Bỏ qua {self.path}: {e}")
+                return False
+
+            changed = new != self.current
+            self.current = new
+        if changed:
+            print(f"⚙️ Nạp lại cấu hình từ {self.path}")
+        return changed
+
+    def update(self, data):
+        """Áp dụng thay đổi từng phần, lưu xuống file, trả về cấu hình mới."""
+        with self._lock:
+            new = parse_settings(data, self.current, self.known_classes)
+
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(new.to_dict(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+            self._mtime = self._stat()
+            self.current = new
+            return new
@@ -0,0 +1,190 @@
+# event_bus.py
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+
+# ===============================
+# TYPED EVENTS
+# ===============================
+@dataclass(frozen=True)
+class Event:
+    ts: float = field(default_factory=time.time, kw_only=True)
+
+    @property
+    def kind(self):
+        return type(self).__name__
+
+    def to_dict(self):
+        data = {k: getattr(self, k) for k in self.__dataclass_fields__}
+        data["type"] = self.kind
+        return data
+
+
+@dataclass(frozen=True)
+class PirEvent(Event):
+    value: int
+
+
+@dataclass(frozen=True)
+class RfidEvent(Event):
+    tag: str
+
+
+@dataclass(frozen=True)
+class MotionEvent(Event):
+    boxes: tuple = ()
+
+
+@dataclass(frozen=True)
+class PetEvent(Event):
+    label: str
+    conf: float
+    box: tuple = ()
+
+
+@dataclass(frozen=True)
+class NoPetEvent(Event):
+    pass
+
+
+@dataclass(frozen=True)
+class TriggerEvent(Event):
+    source: str                      # "pir" | "motion"
+    preroll: tuple = field(default=(), repr=False)  # ((ts, jpeg bytes), ...)
+
+    def to_dict(self):
+        return {"type": self.kind, "ts": self.ts, "source": self.source,
+                "preroll_frames": len(self.preroll)}
+
+
+@dataclass(frozen=True)
+class LogEvent(Event):
+    message: str
+
+
+@dataclass(frozen=True)
+class LogResetEvent(Event):
+    pass
+
+
+# ===============================
+# SUBSCRIPTION (BOUNDED QUEUE)
+# ===============================
+class Subscription:
+    """
+    Hàng đợi riêng cho mỗi subscriber, có giới hạn kích thước.
+
+    policy="drop_oldest": khi đầy thì bỏ event cũ nhất (dành cho consumer
+    realtime như SSE, camera_loop) — publisher không bao giờ bị chặn.
+    policy="block": publisher chờ tối đa `block_timeout` giây rồi mới bỏ
+    event (dành cho consumer không được mất dữ liệu như log writer).
+    """
+
+    def __init__(self, bus, types, maxsize=256, policy="drop_oldest", block_timeout=1.0):
+        self.bus = bus
+        self.types = tuple(types) if types else (Event,)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def accepts(self, event):
+        return isinstance(event, self.types)
+
+    def put(self, event):
+        with self._cond:
+            if self._closed:
+                return False
+
+            if len(self._queue) >= self.maxsize:
+                if self.policy == "block":
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.maxsize and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.dropped += 1
+                            return False
+                        self._cond.wait(remaining)
+                    if self._closed:
+                        return False
+                else:
+                    self._queue.popleft()
+                    self.dropped += 1
+
+            self._queue.append(event)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Lấy 1 event; trả về None nếu hết thời gian chờ hoặc đã đóng."""
+        with self._cond:
+            if not self._queue and not self._closed:
+                self._cond.wait(timeout)
+            if not self._queue:
+                return None
+            event = self._queue.popleft()
+            self._cond.notify_all()
+            return event
+
+    def drain(self):
+        """Lấy toàn bộ event đang chờ, không chặn."""
+        with self._cond:
+            events = list(self._queue)
+            self._queue.clear()
+            self._cond.notify_all()
+            return events
+
+    def close(self):
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        while not self._closed:
+            event = self.get(timeout=1.0)
+            if event is not None:
+                yield event
+
+
+# ===============================
+# EVENT BUS
+# ===============================
+class EventBus:
+    """Publish/subscribe trong tiến trình giữa sensor, vision và web."""
+
+    def __init__(self):
+        self._subs = ()
+        self._lock = threading.Lock()
+
+    def subscribe(self, *types, maxsize=256, policy="drop_oldest", block_timeout=1.0):
+        sub = Subscription(self, types, maxsize=maxsize, policy=policy,
+                           block_timeout=block_timeout)
+        with self._lock:
+            self._subs = self._subs + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+
+    def publish(self, event):
+        # Copy-on-write: đọc tuple không cần khóa
+        delivered = 0
+        for sub in self._subs:
+            if sub.accepts(event) and sub.put(event):
+                delivered += 1
+        return delivered
+
+    def subscriber_count(self):
+        return len(self._subs)
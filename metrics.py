@@ -0,0 +1,151 @@
+# metrics.py
+
+import threading
+from bisect import bisect_left
+
+
+def _latency_bounds(lowest=1e-5, highest=10.0, sub_buckets=4):
+    """
+    Biên bucket kiểu HDR: mỗi lũy thừa 2 chia thành `sub_buckets` phần đều,
+    sai số tương đối ~1/sub_buckets trên toàn dải 10µs .. 10s.
+    """
+    bounds = []
+    base = lowest
+    while base < highest:
+        for i in range(sub_buckets):
+            bounds.append(base * (1 + i / sub_buckets))
+        base *= 2
+    bounds.append(base)
+    return bounds
+
+
+LATENCY_BOUNDS = _latency_bounds()
+
+# Bucket xuất ra /metrics: ít series (mỗi stage 15 dòng `le` thay vì ~82),
+# bucket HDR chi tiết chỉ giữ trong RAM cho percentile()
+EXPORT_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def dec(self, n=1):
+        self.inc(-n)
+
+
+class Histogram:
+    """Histogram độ trễ (giây), ghi O(log số bucket), không cấp phát bộ nhớ."""
+
+    def __init__(self, bounds=LATENCY_BOUNDS, export_bounds=EXPORT_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # bucket cuối = +Inf
+        self.export_bounds = export_bounds
+        self.export_counts = [0] * (len(export_bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        j = bisect_left(self.export_bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.export_counts[j] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """Ước lượng percentile (0..100) từ bucket, trả về biên trên."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return 0.0
+
+        rank = q / 100.0 * total
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank and c:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+
+class Registry:
+    """Tập metric có tên + label, xuất theo định dạng text của Prometheus."""
+
+    def __init__(self):
+        self._metrics = {}  # name -> (type, help, {labels tuple: metric})
+        self._lock = threading.Lock()
+
+    def _get(self, kind, cls, name, help_text, labels):
+        key = tuple(sorted(labels.items()))
+        family = self._metrics.get(name)
+        if family is None or key not in family[2]:
+            with self._lock:
+                family = self._metrics.setdefault(name, (kind, help_text, {}))
+                family[2].setdefault(key, cls())
+        return family[2][key]
+
+    def counter(self, name, help_text="", **labels):
+        return self._get("counter", Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", **labels):
+        return self._get("gauge", Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text="", **labels):
+        return self._get("histogram", Histogram, name, help_text, labels)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            families = sorted(self._metrics.items())
+
+        for name, (kind, help_text, series) in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for key, metric in sorted(series.items()):
+                labels = ",".join(f'{k}="{v}"' for k, v in key)
+
+                if kind != "histogram":
+                    lines.append(f"{name}{{{labels}}} {metric.value}" if labels
+                                 else f"{name} {metric.value}")
+                    continue
+
+                prefix = labels + "," if labels else ""
+                cumulative = 0
+                for bound, c in zip(metric.export_bounds, metric.export_counts):
+                    cumulative += c
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound:.6g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {metric.count}')
+                suffix = f"{{{labels}}}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {metric.sum}")
+                lines.append(f"{name}_count{suffix} {metric.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
@@ -0,0 +1,174 @@
+# sensors/serial_ingest.py
+
+import asyncio
+import os
+import threading
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows: chỉ dùng được pyserial-asyncio / socket
+    termios = tty = None
+
+from event_bus import PirEvent, RfidEvent
+
+try:
+    import serial_asyncio
+except ImportError:  # pyserial-asyncio là tùy chọn
+    serial_asyncio = None
+
+MAX_LINE = 256
+
+
+def parse_line(line):
+    """
+    Giao thức Arduino -> Python (mỗi dòng 1 lệnh):
+        PIR:<0|1>
+        RFID:<tag>
+    Trả về event tương ứng, hoặc None nếu dòng không hợp lệ.
+    """
+    line = line.strip()
+
+    if line.startswith("PIR:"):
+        try:
+            return PirEvent(value=1 if int(line[4:]) else 0)
+        except ValueError:
+            return None
+
+    if line.startswith("RFID:"):
+        tag = line[5:].strip()
+        return RfidEvent(tag=tag) if tag else None
+
+    return None
+
+
+class SensorIngest:
+    """
+    Đọc dữ liệu PIR/RFID từ Arduino bằng asyncio (không polling).
+
+    port có thể là:
+        - cổng serial: "/dev/ttyACM0", "COM3" (cần pyserial-asyncio,
+          trên Linux/macOS có thể mở trực tiếp tty/pty mà không cần)
+        - socket: "socket://127.0.0.1:9012" (Wokwi bridge, test)
+    Tự kết nối lại với backoff tăng dần khi mất kết nối.
+    """
+
+    def __init__(self, port, handler, baudrate=115200,
+                 reconnect_min=0.5, reconnect_max=10.0):
+        self.port = port
+        self.handler = handler
+        self.baudrate = baudrate
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+
+        self.connected = False
+        self.lines = 0
+        self.bad_lines = 0
+
+        self._writer = None
+        self._stopping = False
+
+    # ------------ CONNECTION ------------ #
+    async def _open(self):
+        if self.port.startswith("socket://"):
+            host, _, port = self.port[len("socket://"):].rpartition(":")
+            return await asyncio.open_connection(host, int(port), limit=MAX_LINE * 4)
+
+        if serial_asyncio is not None:
+            return await serial_asyncio.open_serial_connection(
+                url=self.port, baudrate=self.baudrate, limit=MAX_LINE * 4)
+
+        if os.name != "posix":
+            raise RuntimeError("Cần cài pyserial-asyncio để đọc cổng serial")
+
+        # tty/pty trên POSIX: đọc trực tiếp qua file descriptor non-blocking
+        loop = asyncio.get_running_loop()
+        fd = os.open(self.port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            self._configure_tty(fd)
+        except (OSError, ValueError):
+            os.close(fd)
+            raise
+        reader = asyncio.StreamReader(limit=MAX_LINE * 4)
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", buffering=0))
+        return reader, None
+
+    def _configure_tty(self, fd):
+        """Raw mode (không echo / không xử lý dòng) + baudrate, như pyserial."""
+        if not os.isatty(fd):
+            return
+        speed = getattr(termios, f"B{self.baudrate}", None)
+        if speed is None:
+            raise ValueError(f"baudrate {self.baudrate} không được hỗ trợ")
+
+        tty.setraw(fd)
+        attrs = termios.tcgetattr(fd)
+        attrs[2] |= termios.CLOCAL | termios.CREAD  # bỏ qua modem control, bật nhận
+        attrs[4] = attrs[5] = speed                 # ispeed, ospeed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+    async def _read_lines(self, reader):
+        while not self._stopping:
+            try:
+                raw = await reader.readuntil(b"\n")
+            except asyncio.LimitOverrunError as e:
+                # Dòng quá dài (nhiễu serial): bỏ qua tới ký tự xuống dòng
+                await reader.readexactly(e.consumed)
+                self.bad_lines += 1
+                continue
+            except asyncio.IncompleteReadError:
+                return
+
+            if len(raw) > MAX_LINE:
+                self.bad_lines += 1
+                continue
+
+            self.lines += 1
+            event = parse_line(raw.decode("utf-8", errors="ignore"))
+            if event is None:
+                self.bad_lines += 1
+                continue
+
+            self.handler(event)
+
+    async def run(self):
+        delay = self.reconnect_min
+
+        while not self._stopping:
+            try:
+                reader, self._writer = await self._open()
+            except (OSError, ValueError, RuntimeError) as e:
+                print(f"❌ Sensor: không kết nối được {self.port}: {e}")
+                await asyncio.sleep(delay)
+                delay = min(self.reconnect_max, delay * 2)
+                continue
+
+            self.connected = True
+            delay = self.reconnect_min
+            print(f"✅ Sensor: đã kết nối {self.port}")
+
+            try:
+                await self._read_lines(reader)
+            except OSError as e:
+                print(f"❌ Sensor: lỗi đọc: {e}")
+            finally:
+                self.connected = False
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+
+            if not self._stopping:
+                print("🔌 Sensor: mất kết nối, thử lại...")
+                await asyncio.sleep(delay)
+
+    # ------------ THREAD API ------------ #
+    def start(self):
+        """Chạy event loop riêng trong 1 daemon thread."""
+        def _run():
+            asyncio.new_event_loop().run_until_complete(self.run())
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def stop(self):
+        self._stopping = True
@@ -0,0 +1,67 @@
+# sensors/state.py
+
+import json
+import threading
+import time
+from dataclasses import dataclass, asdict, replace
+
+
+@dataclass(frozen=True, slots=True)
+class SensorSnapshot:
+    """Trạng thái sensor + presence tại 1 thời điểm; không bao giờ bị sửa."""
+
+    version: int = 0
+    pir: int = 0
+    rfid: str | None = None
+    pet_detected: bool = False
+    behavior_score: int = 0
+    ts: float = 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class SensorStateStore:
+    """
+    Giữ snapshot hiện tại cùng JSON đã serialize sẵn.
+
+    update() tạo snapshot mới (version + 1) và thay cả cặp (snapshot, json)
+    bằng 1 phép gán -> người đọc không cần khóa và không bao giờ thấy trạng
+    thái nửa cũ nửa mới. Không có gì thay đổi thì giữ nguyên version.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # chỉ để tuần tự hóa các lần ghi
+        self._current = self._pack(SensorSnapshot(ts=time.time()))
+
+    @staticmethod
+    def _pack(snapshot):
+        return snapshot, json.dumps(snapshot.to_dict(), ensure_ascii=False).encode()
+
+    @property
+    def snapshot(self):
+        return self._current[0]
+
+    def get(self):
+        """(snapshot, json bytes) cùng version."""
+        return self._current
+
+    def wait(self, since, timeout, poll=0.1):
+        """
+        Chờ tới khi version khác `since` (hoặc hết timeout), trả về get().
+        Poll bằng time.sleep thay vì Condition để không chặn event loop gevent.
+        """
+        deadline = time.monotonic() + timeout
+        while self._current[0].version == since and time.monotonic() < deadline:
+            time.sleep(poll)
+        return self._current
+
+    def update(self, **changes):
+        with self._lock:
+            old = self._current[0]
+            if all(getattr(old, k) == v for k, v in changes.items()):
+                return old
+
+            new = replace(old, version=old.version + 1, ts=time.time(), **changes)
+            self._current = self._pack(new)
+            return new
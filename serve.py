@@ -0,0 +1,48 @@
+# serve.py
+#
+# Chế độ production: gevent WSGI server thay cho app.run(debug=True).
+#   python serve.py                 # 0.0.0.0:5000
+#   PET_HOST=127.0.0.1 PET_PORT=8000 python serve.py
+#
+# - Mỗi client stream (/video_feed, /events) là 1 greenlet thay vì 1 OS thread.
+# - Pipeline capture / YOLO / sensor vẫn chạy trong OS thread thật
+#   (thread=False) nên cv2 / torch không chặn event loop.
+# - Chỉ chạy 1 process: camera chỉ mở được 1 lần.
+# - /ws/video (flask-sock): luồng đọc socket của mỗi WebSocket là greenlet.
+# - subprocess / os / signal không patch: ffmpeg (/stream.mp4) được mở từ OS
+#   thread, gevent.subprocess chỉ chạy được trên main thread.
+
+from gevent import monkey
+
+monkey.patch_all(thread=False, select=False, subprocess=False, os=False, signal=False)
+
+import os  # noqa: E402
+
+import gevent  # noqa: E402
+from gevent.event import Event  # noqa: E402
+from gevent.pywsgi import WSGIServer  # noqa: E402
+
+import server  # noqa: E402
+
+HOST = os.environ.get("PET_HOST", "0.0.0.0")
+PORT = int(os.environ.get("PET_PORT", "5000"))
+
+
+class GreenletThread(gevent.Greenlet):
+    """simple-websocket tạo thread đọc socket; với gevent phải là greenlet."""
+
+    def __init__(self, target=None):
+        super().__init__(target)
+
+
+# socket đã được patch: đọc từ OS thread khác sẽ lỗi "Cannot switch to a different thread"
+server.app.config["SOCK_SERVER_OPTIONS"] = {"thread_class": GreenletThread, "event_class": Event}
+
+
+if __name__ == "__main__":
+    print("🚀 SYSTEM MODE D — production (gevent)")
+    server.start_background()
+
+    http = WSGIServer((HOST, PORT), server.app, log=None)
+    print(f"🌐 Listening on http://{HOST}:{PORT}")
+    http.serve_forever()
@@ -1,63 +1,246 @@
-from flask import Flask, render_template, Response, jsonify
+from flask import Flask, render_template, Response, jsonify, request, send_from_directory, abort
 import cv2
 import threading
 import time
 import os
+import json
 from datetime import datetime
 from ultralytics import YOLO
 import random
+import struct
+from functools import lru_cache
+
+from ai.presence import PresenceEngine
+from assets import StaticAssets, negotiate, compress
+from ai.profiles import PROFILES
+from config import SettingsStore
+from metrics import registry
+from event_bus import (EventBus, PirEvent, RfidEvent, MotionEvent, PetEvent,
+                       NoPetEvent, TriggerEvent, LogEvent, LogResetEvent)
+from sensors.serial_ingest import SensorIngest
+from sensors.state import SensorStateStore
+from video.preroll import PrerollBuffer, sample_frames
+from video.recorder import ClipRecorder
+from video.motion import MotionDetector
+from video.overlay import Overlay
+from video.capture import enable_mjpeg, is_jpeg_packet, decode_bgr, decode_gray, jpeg_size
+from video.encoder import make_encoder
+from video.variants import VariantCache, AdaptiveRate, AckRate, quantize
+from video.h264 import H264Stream
+from video.sources import open_source
+
+try:
+    from flask_sock import Sock
+except ImportError:  # flask-sock là tùy chọn (chỉ cần cho /ws/video)
+    Sock = None
 
 app = Flask(__name__)
+sock = Sock(app) if Sock is not None else None
 LOG_FILE = "motion_log.txt"
 
+# Cổng Arduino thật, vd "/dev/ttyACM0", "COM3", "socket://localhost:9012".
+# Để trống -> dùng arduino_simulation_loop()
+SENSOR_PORT = os.environ.get("PET_SENSOR_PORT", "")
+
+# File video / thư mục ảnh phát lại thay cho webcam (chạy headless)
+CAMERA_SOURCE = os.environ.get("PET_CAMERA_SOURCE", "")
+
+# Webcam MJPEG: gửi thẳng JPEG của camera cho viewer, chỉ giải mã khi phân tích.
+# Ở chế độ này stream không có overlay (box / chữ).
+CAMERA_MJPEG = os.environ.get("PET_CAMERA_MJPEG", "0") == "1"
+
 # ===============================
 # YOLO MODEL (COCO)
 # ===============================
 PET_MODEL = YOLO("yolov8n.pt")
-PET_THRESHOLD = 0.25
+
+# ===============================
+# SETTINGS (hot reload)
+# ===============================
+# Ngưỡng YOLO, nhãn pet, ngưỡng motion, cooldown: sửa qua /settings hoặc sửa
+# file JSON, camera_loop nhận cấu hình mới ở frame kế tiếp.
+SETTINGS_FILE = os.environ.get("PET_SETTINGS_FILE", "settings.json")
+SETTINGS_POLL = 2  # giây, chu kỳ kiểm tra file thay đổi
+settings = SettingsStore(SETTINGS_FILE, known_classes=set(PET_MODEL.names.values()))
+
+# ===============================
+# PRESENCE / BEHAVIOR SCORE
+# ===============================
+PRESENCE_WEIGHTS = {"motion": 3, "pir": 5, "rfid": 3, "yolo": 10}
+PRESENCE_WINDOW = 30        # giây, hằng số thời gian của EMA
+PRESENCE_ENTER_SCORE = 30   # điểm >= ngưỡng này -> có pet
+PRESENCE_LEAVE_SCORE = 10   # điểm < ngưỡng này đủ lâu -> hết pet
+PRESENCE_LEAVE_HOLD = 10    # giây
+
+presence = PresenceEngine(
+    weights=PRESENCE_WEIGHTS,
+    window=PRESENCE_WINDOW,
+    enter_score=PRESENCE_ENTER_SCORE,
+    leave_score=PRESENCE_LEAVE_SCORE,
+    leave_hold=PRESENCE_LEAVE_HOLD,
+)
+
+# ===============================
+# EVENT BUS
+# ===============================
+# Sensor, vision và web giao tiếp qua event thay vì biến global
+bus = EventBus()
+
+# ===============================
+# JPEG ENCODER
+# ===============================
+# "auto": libjpeg-turbo (PyTurboJPEG) nếu có, không thì OpenCV
+JPEG_BACKEND = os.environ.get("PET_JPEG_BACKEND", "auto")
+JPEG_SUBSAMPLING = "420"
+JPEG_FAST_DCT = True
+
+jpeg_encoder = make_encoder(JPEG_BACKEND, JPEG_SUBSAMPLING, JPEG_FAST_DCT)
+
+# ===============================
+# PRE-ROLL (N GIÂY TRƯỚC TRIGGER)
+# ===============================
+PREROLL_SECONDS = 3
+PREROLL_QUALITY = 70
+PREROLL_DETECT_FRAMES = 3   # số frame pre-roll đưa vào YOLO khi có trigger
+TRIGGER_COOLDOWN = 10       # giây giữa 2 lần flush pre-roll
+
+preroll = PrerollBuffer(seconds=PREROLL_SECONDS, quality=PREROLL_QUALITY, encoder=jpeg_encoder)
+
+# ===============================
+# CLIP RECORDING
+# ===============================
+CLIP_DIR = "clips"
+CLIP_FPS = 10
+CLIP_SEGMENT_SECONDS = 10
+CLIP_POST_SECONDS = 5       # ghi thêm sau khi hết hoạt động
+CLIP_MAX_SECONDS = 120
+CLIP_FOURCC = "avc1"        # H.264 (fallback mp4v nếu OpenCV không hỗ trợ)
+
+recorder = ClipRecorder(
+    bus,
+    clip_dir=CLIP_DIR,
+    fps=CLIP_FPS,
+    segment_seconds=CLIP_SEGMENT_SECONDS,
+    post_seconds=CLIP_POST_SECONDS,
+    max_seconds=CLIP_MAX_SECONDS,
+    fourcc=CLIP_FOURCC,
+)
+
+# ===============================
+# METRICS (/metrics)
+# ===============================
+STAGES = ("read", "preroll", "motion", "trigger", "predict", "overlay",
+          "publish", "encode", "write_log")
+STAGE = {name: registry.histogram("pet_stage_seconds", "Thời gian mỗi bước pipeline", stage=name)
+         for name in STAGES}
+
+FRAMES_TOTAL = registry.counter("pet_frames_total", "Số frame đọc từ camera")
+FRAMES_DROPPED = registry.counter("pet_frames_dropped_total", "Số lần camera.read() thất bại")
+INFERENCE_TOTAL = registry.counter("pet_inference_total", "Số lần chạy YOLO")
+ENCODE_TOTAL = registry.counter("pet_encode_total", "Số lần encode JPEG cho stream")
+STREAM_DOWNSHIFTS = registry.counter("pet_stream_downshifts_total", "Số lần hạ chất lượng do client chậm")
+STREAM_BYTES = {transport: registry.counter("pet_stream_bytes_total", "Số byte video gửi cho viewer",
+                                            transport=transport)
+                for transport in ("mjpeg", "ws", "h264")}
+WS_FRAMES_SKIPPED = registry.counter("pet_ws_frames_skipped_total",
+                                     "Số frame bỏ qua vì client WebSocket chưa ack")
+CAPTURE_FPS = registry.gauge("pet_capture_fps", "FPS của camera_loop (EMA)")
+STREAM_CLIENTS = registry.gauge("pet_stream_clients", "Số client đang xem /video_feed")
+PROCESS_CPU = registry.gauge("pet_process_cpu_seconds", "CPU (user + system) của server")
 
 # ===============================
 # GLOBAL STATES
 # ===============================
-last_pir = 0
-last_rfid = None
-pet_detected_flag = False
-behavior_score = 0
+# Snapshot sensor + presence bất biến, chỉ được ghi bởi status_loop()
+sensor_store = SensorStateStore()
+STATUS_REFRESH = 1.0  # giây, cập nhật điểm hành vi (giảm dần cả khi không có event)
+STATUS_MAX_WAIT = 60  # giây, giới hạn long-poll /sensor_status?wait=
+
+# Thống kê số log theo phút, chỉ được ghi bởi stats_loop()
+motion_stats_counts = {}
+motion_stats_lock = threading.Lock()
+
+# Đổi khi log / thống kê bị xóa (qua ngày) -> client đang lấy delta phải tải lại
+log_epoch = int(time.time())
+motion_stats_epoch = log_epoch
 
 camera = None
-latest_frame = None
-last_gray = None
+latest_frame = None       # BGR; None nếu pass-through và frame chưa được giải mã
+latest_jpeg = None        # JPEG gốc của camera (pass-through)
+latest_overlay = Overlay()
+latest_width = 0
+latest_frame_time = 0.0
+latest_seq = 0
+# Motion so sánh trên ảnh xám 1/MOTION_SCALE (1, 2, 4 hoặc 8); JPEG camera được
+# giải mã thẳng ở độ phân giải thu nhỏ. Ảnh màu đầy đủ chỉ dùng cho YOLO / clip.
+MOTION_SCALE = 2
+motion_detector = MotionDetector(diff_threshold=settings.current.motion_diff_threshold,
+                                 min_area=settings.current.motion_min_area, scale=MOTION_SCALE)
 camera_lock = threading.Lock()
+camera_stop = threading.Event()
+CAMERA_LOOP_SLEEP = 0.03  # giây nghỉ sau mỗi frame (0 khi benchmark)
+
+STREAM_POLL = 0.01  # giây, chu kỳ client kiểm tra frame mới
+STREAM_MAX_VARIANTS = 8
 
-# Cooldown tránh spam log
+# /snapshot.jpg: giữ nguyên ảnh (cùng ETag) khi cảnh tĩnh
+SNAPSHOT_MIN_INTERVAL = 1    # giây, tối thiểu giữa 2 snapshot mới
+SNAPSHOT_MAX_AGE = 30        # giây, làm mới dù không có chuyển động
+last_motion_time = 0.0
+snapshots = {}  # (q, w, overlay) -> {"etag", "jpeg", "ts"}
+snapshots_lock = threading.Lock()
+
+# Cooldown tránh spam log (settings.current.no_pet_cooldown)
 last_no_pet_log = 0
-NO_PET_COOLDOWN = 5  # giây
 
 
 # ===============================
 # LOGGING
 # ===============================
-def write_log(msg):
-    entry = f"{datetime.now().strftime('%H:%M:%S')} - {msg}"
+def write_log(msg, ts=None):
+    t0 = time.perf_counter()
+    stamp = datetime.fromtimestamp(ts) if ts is not None else datetime.now()
+    entry = f"{stamp.strftime('%H:%M:%S')} - {msg}"
     with open(LOG_FILE, "a", encoding="utf-8") as f:
         f.write(entry + "\n")
     print("📝", entry)
+    STAGE["write_log"].observe(time.perf_counter() - t0)
+
+
+def log_event(msg):
+    bus.publish(LogEvent(message=msg))
 
 
 def log_motion():
-    write_log("PIR: phát hiện chuyển động")
+    log_event("PIR: phát hiện chuyển động")
 
 
 def log_yolo(label, conf):
-    write_log(f"AI xác minh PET: {label} ({conf:.2f})")
+    log_event(f"AI xác minh PET: {label} ({conf:.2f})")
 
 
 def log_no_pet():
-    write_log("AI xác minh: Không phát hiện thú cưng")
+    log_event("AI xác minh: Không phát hiện thú cưng")
 
 
 def log_rfid(tag):
-    write_log(f"RFID: Mèo của Vân mang thẻ {tag}")
+    log_event(f"RFID: Mèo của Vân mang thẻ {tag}")
+
+
+# ===============================
+# LOG WRITER (EVENT CONSUMER)
+# ===============================
+def log_writer_loop(sub):
+    global log_epoch
+
+    for event in sub:
+        if isinstance(event, LogResetEvent):
+            with open(LOG_FILE, "w", encoding="utf-8") as f:
+                f.write("")
+            log_epoch = int(time.time())
+            print("🗑️ Log reset for new day:", datetime.now().strftime("%Y-%m-%d"))
+        else:
+            write_log(event.message, event.ts)
 
 
 # ===============================
@@ -65,147 +248,337 @@ def log_rfid(tag):
 # ===============================
 def init_camera():
     global camera
-    backends = [
-        (cv2.CAP_DSHOW, "DirectShow"),
-        (cv2.CAP_MSMF, "Media Foundation"),
-        (0, "Default")
-    ]
 
-    for backend, name in backends:
-        try:
-            cam = cv2.VideoCapture(0, backend) if backend != 0 else cv2.VideoCapture(0)
-            if cam.isOpened():
-                cam.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                cam.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                camera = cam
-                print(f"📷 Camera started using {name}")
-                return
-        except:
-            pass
+    if CAMERA_SOURCE:
+        camera = open_source(CAMERA_SOURCE, realtime=True, loop=True)
+        print(f"📷 Camera source: {CAMERA_SOURCE}")
+    else:
+        backends = [
+            (cv2.CAP_DSHOW, "DirectShow"),
+            (cv2.CAP_MSMF, "Media Foundation"),
+            (0, "Default")
+        ]
+
+        for backend, name in backends:
+            try:
+                cam = cv2.VideoCapture(0, backend) if backend != 0 else cv2.VideoCapture(0)
+                if cam.isOpened():
+                    cam.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                    cam.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                    camera = cam
+                    print(f"📷 Camera started using {name}")
+                    break
+            except:
+                pass
+        else:
+            print("❌ Camera not found!")
+            return
+
+    if CAMERA_MJPEG:
+        # camera_loop() tự nhận biết frame là JPEG hay BGR, nên nếu backend
+        # bỏ qua yêu cầu thì vẫn chạy bình thường
+        if enable_mjpeg(camera):
+            print("📷 MJPEG pass-through")
+        else:
+            print("⚠️ Camera không hỗ trợ MJPEG pass-through, dùng BGR")
+
+
+# ===============================
+# PET DETECTION
+# ===============================
+@lru_cache(maxsize=8)
+def class_ids(labels):
+    """Nhãn -> class id của PET_MODEL (vd ("dog", "cat") -> [16, 15])."""
+    return sorted(i for i, name in PET_MODEL.names.items() if name in labels)
+
+
+# camera_loop và preroll_detect_loop dùng chung model; predictor của ultralytics
+# không thread-safe
+model_lock = threading.Lock()
+
+
+def detect_pets(frame):
+    """Chạy YOLO, trả về list (label, conf, (x1, y1, x2, y2)) của các nhãn pet."""
+    cfg = settings.current
+    profile = PROFILES[cfg.detect_profile]
+    labels = profile.classes or cfg.pet_classes
+    pets = []
+    with model_lock:
+        t0 = time.perf_counter()
+        # classes=: NMS / hậu xử lý chỉ xét các class pet thay vì cả 80 class COCO
+        results = PET_MODEL.predict(frame, conf=cfg.pet_threshold, verbose=False,
+                                    **profile.predict_kwargs(class_ids(labels)))
+        STAGE["predict"].observe(time.perf_counter() - t0)
+    INFERENCE_TOTAL.inc()
+
+    for r in results:
+        for box in r.boxes:
+            conf = float(box.conf[0])
+            cls = int(box.cls[0])
+            label = PET_MODEL.names[cls]
 
-    print("❌ Camera not found!")
+            if label in labels and conf >= cfg.pet_threshold:
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
+                pets.append((label, conf, (int(x1), int(y1), int(x2), int(y2))))
+
+    return pets
+
+
+def flush_preroll(source):
+    # Pre-roll -> clip writer + preroll_detect_loop (qua bus), không chặn camera_loop
+    bus.publish(TriggerEvent(source=source, preroll=preroll.flush()))
+
+
+def preroll_detect_loop(sub):
+    # YOLO trên vài frame trải đều trong pre-roll của mỗi trigger
+    for event in sub:
+        for ts, frame in sample_frames(event.preroll, PREROLL_DETECT_FRAMES):
+            pets = detect_pets(frame)
+            if pets:
+                label, conf, box = max(pets, key=lambda p: p[1])
+                log_yolo(label, conf)
+                bus.publish(PetEvent(label=label, conf=conf, box=box, ts=ts))
+                break
 
 
 # ===============================
 # CAMERA LOOP (YOLO only when PIR=1)
 # ===============================
 def camera_loop():
-    global latest_frame, last_gray, camera
-    global pet_detected_flag, behavior_score, last_pir
+    global latest_frame, latest_jpeg, latest_overlay, latest_width, latest_frame_time, latest_seq
+    global camera
+    global last_motion_time
     global last_no_pet_log
 
-    while True:
+    pir_sub = bus.subscribe(PirEvent, maxsize=16)
+    pir = 0
+    was_moving = False
+    last_trigger = 0
+    last_frame_time = None
+    applied_settings = settings.current
+
+    while not camera_stop.is_set():
+        pir_edge = False
+        for event in pir_sub.drain():
+            if event.value == 1 and pir == 0:
+                pir_edge = True
+            pir = event.value
+
         if camera is None or not camera.isOpened():
             init_camera()
             time.sleep(1)
             continue
 
+        t0 = time.perf_counter()
         ret, frame = camera.read()
+        t1 = time.perf_counter()
+        STAGE["read"].observe(t1 - t0)
+
         if not ret:
+            FRAMES_DROPPED.inc()
             time.sleep(0.05)
             continue
 
-        # ------------ MOTION DETECTION ------------ #
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
-        motion_detected = False
-
-        if last_gray is not None:
-            diff = cv2.absdiff(last_gray, gray)
-            thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)[1]
-            thresh = cv2.dilate(thresh, None, iterations=2)
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-            for c in contours:
-                if cv2.contourArea(c) > 800:
-                    motion_detected = True
-                    x, y, w, h = cv2.boundingRect(c)
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-        last_gray = gray
+        FRAMES_TOTAL.inc()
+        if last_frame_time is not None and t1 > last_frame_time:
+            CAPTURE_FPS.set(0.9 * CAPTURE_FPS.value + 0.1 / (t1 - last_frame_time))
+        last_frame_time = t1
+
+        # MJPEG pass-through: frame = None cho tới khi cần ảnh màu (YOLO)
+        jpeg = None
+        gray = None
+        if is_jpeg_packet(frame):
+            jpeg = frame.tobytes()
+            frame = None
+            # Giải mã ngay để loại packet hỏng (chỉ có SOI) trước khi vào pre-roll / clip
+            t0 = time.perf_counter()
+            gray = decode_gray(jpeg, MOTION_SCALE)
+            t1 = time.perf_counter()
+            if gray is None:
+                FRAMES_DROPPED.inc()
+                continue
+            width = (jpeg_size(jpeg) or (latest_width, 0))[0]
+        else:
+            width = frame.shape[1]
+
+        # Frame không bao giờ bị vẽ lên: pre-roll / clip / YOLO luôn nhận ảnh sạch
+        if jpeg is not None:
+            preroll.push_jpeg(jpeg)
+        else:
+            preroll.push(frame)
+        if recorder.recording:
+            recorder.submit(jpeg if jpeg is not None else frame)
+        decode_time = t1 - t0 if gray is not None else 0.0
+        t0 = time.perf_counter()
+        STAGE["preroll"].observe(t0 - t1)
 
+        # ------------ MOTION DETECTION ------------ #
+        cfg = settings.current
+        if cfg is not applied_settings:  # /settings hoặc file vừa đổi
+            motion_detector.diff_threshold = cfg.motion_diff_threshold
+            motion_detector.min_area = cfg.motion_min_area
+            applied_settings = cfg
+        if gray is not None:
+            motion_boxes = motion_detector.update_gray(gray)
+        else:
+            motion_boxes = motion_detector.update(frame)
+        motion_detected = bool(motion_boxes)
         if motion_detected:
-            behavior_score = min(100, behavior_score + 3)
+            last_motion_time = time.time()
+        t1 = time.perf_counter()
+        STAGE["motion"].observe(t1 - t0 + decode_time)
+
+        # Chỉ publish khi trạng thái chuyển động thay đổi
+        motion_edge = motion_detected and not was_moving
+        if motion_detected != was_moving:
+            bus.publish(MotionEvent(boxes=tuple(motion_boxes)))
+            was_moving = motion_detected
+
+        # ------------ PRE-ROLL FLUSH (PIR / MOTION TRIGGER) ------------ #
+        now = time.time()
+        if (pir_edge or motion_edge) and now - last_trigger >= TRIGGER_COOLDOWN:
+            flush_preroll("pir" if pir_edge else "motion")
+            last_trigger = now
+            STAGE["trigger"].observe(time.perf_counter() - t1)
 
         # ------------ YOLO DETECTION (ONLY IF PIR=1) ------------ #
+        pets = []
         pet_label = "Khong thay"
         pet_conf = 0.0
 
-        # Chỉ reset trạng thái khi PIR = 0
-        if last_pir == 0:
-            pet_detected_flag = False
-
-        if last_pir == 1:
-
-            results = PET_MODEL.predict(frame, conf=PET_THRESHOLD, verbose=False)
-            found_pet = False
-
-            for r in results:
-                for box in r.boxes:
-                    conf = float(box.conf[0])
-                    cls = int(box.cls[0])
-                    label = PET_MODEL.names[cls]
-
-                    if label in ["dog", "cat"] and conf >= PET_THRESHOLD:
-                        found_pet = True
-                        pet_detected_flag = True
-                        pet_label = label
-                        pet_conf = conf
-                        log_yolo(label, conf)
-
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 200, 255), 2)
-                        cv2.putText(frame, f"{label} {conf:.2f}",
-                                    (x1, y1 - 5),
-                                    cv2.FONT_HERSHEY_SIMPLEX,
-                                    0.7, (0, 255, 255), 2)
-
-            
-            if not found_pet:
+        if pir == 1 and frame is None:
+            frame = decode_bgr(jpeg)  # None nếu JPEG hỏng phần dữ liệu -> bỏ qua YOLO
+
+        if pir == 1 and frame is not None:
+            pets = detect_pets(frame)
+
+            for label, conf, box in pets:
+                pet_label = label
+                pet_conf = conf
+                log_yolo(label, conf)
+                bus.publish(PetEvent(label=label, conf=conf, box=box))
+
+            if not pets:
                 now = time.time()
-                if now - last_no_pet_log >= NO_PET_COOLDOWN:
+                if now - last_no_pet_log >= settings.current.no_pet_cooldown:
+                    bus.publish(NoPetEvent())
                     log_no_pet()
                     last_no_pet_log = now
 
-        # ------------ TEXT OVERLAY ------------ #
-        cv2.putText(
-            frame,
-            f"Pet: {pet_label} ({pet_conf:.2f})",
-            (10, 30),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.7, (255, 200, 0), 2
-        )
-
         # ------------ UPDATE STREAM ------------ #
+        # Overlay chỉ là metadata, được vẽ lúc encode cho viewer
+        overlay = Overlay(motion=tuple(motion_boxes), pets=tuple(pets),
+                          label=pet_label, conf=pet_conf)
+        t1 = time.perf_counter()
         with camera_lock:
-            latest_frame = frame.copy()
+            # frame không bị sửa sau bước này -> không cần copy
+            latest_frame = frame
+            latest_jpeg = jpeg
+            latest_overlay = overlay
+            latest_width = width
+            latest_frame_time = time.time()
+            latest_seq += 1
+        STAGE["publish"].observe(time.perf_counter() - t1)
 
-        time.sleep(0.03)
+        if CAMERA_LOOP_SLEEP:
+            time.sleep(CAMERA_LOOP_SLEEP)
 
 
 # ===============================
-# ARDUINO SIMULATION LOOP
+# SENSOR INPUT (ARDUINO / SIMULATION)
 # ===============================
-def arduino_simulation_loop():
-    global last_pir, last_rfid, behavior_score
+def handle_sensor_event(event):
+    bus.publish(event)
+
+    if isinstance(event, PirEvent) and event.value == 1:
+        log_motion()
+    elif isinstance(event, RfidEvent):
+        log_rfid(event.tag)
 
+
+def arduino_simulation_loop():
     while True:
         action = random.choice(["pir", "rfid", "none"])
 
         if action == "pir":
-            last_pir = random.choice([0, 1])
-            if last_pir == 1:
-                log_motion()
-                behavior_score = min(100, behavior_score + 5)
+            handle_sensor_event(PirEvent(value=random.choice([0, 1])))
 
         elif action == "rfid":
-            last_rfid = "VAN_CAT_001"
-            log_rfid(last_rfid)
-            behavior_score = min(100, behavior_score + 3)
+            handle_sensor_event(RfidEvent(tag="VAN_CAT_001"))
 
         time.sleep(3)
 
 
+# ===============================
+# SENSOR STATE + PRESENCE (EVENT CONSUMER)
+# ===============================
+def status_loop(sub):
+    while True:
+        event = sub.get(timeout=STATUS_REFRESH)
+        changes = {}
+
+        if isinstance(event, PirEvent):
+            changes["pir"] = event.value
+            presence.observe("pir", event.value)
+
+        elif isinstance(event, RfidEvent):
+            changes["rfid"] = event.tag
+            presence.pulse("rfid")
+
+        elif isinstance(event, MotionEvent):
+            presence.observe("motion", 1.0 if event.boxes else 0.0)
+
+        elif isinstance(event, PetEvent):
+            presence.pulse("yolo", event.conf)
+
+        # Version mới chỉ khi có giá trị thay đổi
+        state = presence.snapshot()
+        sensor_store.update(pet_detected=state["present"],
+                            behavior_score=state["behavior_score"], **changes)
+
+
+# ===============================
+# STATS AGGREGATOR (EVENT CONSUMER)
+# ===============================
+def load_motion_stats():
+    if not os.path.exists(LOG_FILE):
+        return
+
+    with motion_stats_lock:
+        with open(LOG_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                minute = line.split(" - ")[0][:5]
+                motion_stats_counts[minute] = motion_stats_counts.get(minute, 0) + 1
+
+
+def stats_loop(sub):
+    global motion_stats_epoch
+
+    for event in sub:
+        with motion_stats_lock:
+            if isinstance(event, LogResetEvent):
+                motion_stats_counts.clear()
+                motion_stats_epoch = int(time.time())
+            else:
+                minute = datetime.fromtimestamp(event.ts).strftime("%H:%M")
+                motion_stats_counts[minute] = motion_stats_counts.get(minute, 0) + 1
+
+
+def start_event_consumers():
+    # Đăng ký trước khi start thread để không mất event đầu tiên
+    consumers = [
+        # policy="block": không được mất dòng log
+        (log_writer_loop, bus.subscribe(LogEvent, LogResetEvent, maxsize=1024, policy="block")),
+        (stats_loop, bus.subscribe(LogEvent, LogResetEvent, maxsize=1024)),
+        (status_loop, bus.subscribe(PirEvent, RfidEvent, MotionEvent, PetEvent, maxsize=256)),
+        # Chỉ giữ trigger mới nhất nếu YOLO chạy không kịp
+        (preroll_detect_loop, bus.subscribe(TriggerEvent, maxsize=1)),
+    ]
+
+    for target, sub in consumers:
+        threading.Thread(target=target, args=(sub,), daemon=True).start()
+
+
 # ===============================
 # DAILY RESET LOG AT 00:00
 # ===============================
@@ -215,49 +588,344 @@ def daily_log_reset():
     while True:
         now = datetime.now()
         if now.day != last_day:
-            with open(LOG_FILE, "w", encoding="utf-8") as f:
-                f.write("")
-            print("🗑️ Log reset for new day:", now.strftime("%Y-%m-%d"))
+            bus.publish(LogResetEvent())
             last_day = now.day
 
         time.sleep(60)
 
 
+def settings_watch_loop():
+    # File settings sửa tay -> nạp lại, camera_loop / detect_pets đọc settings.current
+    while True:
+        settings.reload()
+        time.sleep(SETTINGS_POLL)
+
+
 # ===============================
 # STREAM VIDEO
 # ===============================
-def gen_frames():
-    global latest_frame
-    while True:
-        with camera_lock:
-            if latest_frame is None:
+def _on_encode(seconds):
+    STAGE["encode"].observe(seconds)
+    ENCODE_TOTAL.inc()
+
+
+# JPEG của frame mới nhất theo từng (quality, width), encode 1 lần dùng chung
+jpeg_variants = VariantCache(max_variants=STREAM_MAX_VARIANTS, encoder=jpeg_encoder,
+                             on_encode=_on_encode)
+
+
+def get_latest_frame():
+    """(frame BGR hoặc None, JPEG camera hoặc None, overlay, seq, capture ts)."""
+    with camera_lock:
+        return latest_frame, latest_jpeg, latest_overlay, latest_seq, latest_frame_time
+
+
+def get_latest_jpeg(quality=None, width=None, overlay=True):
+    """
+    Trả về (seq, jpeg bytes, capture ts) của frame mới nhất, hoặc None.
+    overlay=False: ảnh sạch, client tự vẽ box từ /detections.
+    """
+    frame, jpeg, boxes, seq, frame_time = get_latest_frame()
+    if jpeg is not None and quality is None and width is None:
+        # Pass-through: JPEG gốc của camera, không encode (không có overlay)
+        return seq, jpeg, frame_time
+    if frame is None and jpeg is None:
+        return None
+
+    def render():
+        # Chỉ chạy khi variant chưa có trong cache -> không có viewer thì không vẽ
+        if not overlay:
+            return frame if frame is not None else decode_bgr(jpeg)
+
+        t0 = time.perf_counter()
+        image = frame.copy() if frame is not None else decode_bgr(jpeg)
+        if image is not None:
+            boxes.draw(image)
+        STAGE["overlay"].observe(time.perf_counter() - t0)
+        return image
+
+    encoded = jpeg_variants.get(render, seq, frame_time, quality, width, overlay)
+    if encoded is None:
+        return None
+    return seq, encoded[0], encoded[1]
+
+
+def gen_frames(fps=None, quality=None, width=None, adaptive=True, overlay=True):
+    STREAM_CLIENTS.inc()
+    last_seq = -1
+    last_sent = 0.0
+    rate = None
+    try:
+        while True:
+            frame, jpeg, _, seq, _ = get_latest_frame()
+            due = fps is None or time.monotonic() - last_sent >= 1.0 / fps
+            if (frame is None and jpeg is None) or seq == last_seq or not due:
+                # time.sleep được gevent patch khi chạy serve.py -> không chặn
+                time.sleep(STREAM_POLL)
                 continue
 
-            frame = latest_frame.copy()
+            if rate is None:
+                frame_width = latest_width
+                rate = AdaptiveRate(*quantize(quality, width, frame_width), frame_width, fps=fps)
+
+            latest = get_latest_jpeg(*rate.variant(), overlay=overlay)
+            if latest is None:
+                time.sleep(STREAM_POLL)
+                continue
 
-        ok, buffer = cv2.imencode(".jpg", frame)
-        if ok:
-            yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" +
-                   buffer.tobytes() + b"\r\n")
+            last_seq, jpeg, frame_time = latest
+            last_sent = time.monotonic()
+
+            # X-Timestamp: thời điểm capture, để client đo độ trễ
+            header = (f"--frame\r\nContent-Type: image/jpeg\r\n"
+                      f"Content-Length: {len(jpeg)}\r\n"
+                      f"X-Timestamp: {frame_time:.6f}\r\n\r\n").encode()
+
+            # Thời gian yield = thời gian server ghi xong ra socket
+            t0 = time.perf_counter()
+            yield header + jpeg + b"\r\n"
+            STREAM_BYTES["mjpeg"].inc(len(header) + len(jpeg) + 2)
+            if adaptive:
+                downshifts = rate.downshifts
+                rate.record(time.perf_counter() - t0)
+                if rate.downshifts != downshifts:
+                    STREAM_DOWNSHIFTS.inc()
+    finally:
+        STREAM_CLIENTS.dec()
 
 
 @app.route("/video_feed")
 def video_feed():
-    return Response(gen_frames(),
+    # /video_feed?fps=5&q=60&w=320&adaptive=0&overlay=0
+    fps = request.args.get("fps", type=float)
+    return Response(gen_frames(fps=fps if fps and fps > 0 else None,
+                               quality=request.args.get("q", type=int),
+                               width=request.args.get("w", type=int),
+                               adaptive=request.args.get("adaptive", "1") != "0",
+                               overlay=request.args.get("overlay", "1") != "0"),
                     mimetype="multipart/x-mixed-replace; boundary=frame")
 
 
+# ===============================
+# WEBSOCKET STREAM (BINARY + ACK)
+# ===============================
+# Mỗi message nhị phân = header + JPEG. Header (big-endian, 14 byte):
+#   uint32 seq | float64 capture ts | uint16 camera id
+WS_FRAME_HEADER = struct.Struct("!IdH")
+WS_MAX_INFLIGHT = 2  # số frame đã gửi mà client chưa ack
+WS_ACK_TIMEOUT = 2   # giây, coi như mất ack (tránh kẹt stream)
+
+
+def ws_video(ws):
+    """
+    /ws/video?fps=&q=&w=&overlay=: client gửi lại seq (text) sau khi hiển thị
+    xong mỗi frame; ack là tích lũy (mọi seq <= seq được ack coi như xong). Khi đã có WS_MAX_INFLIGHT frame chưa ack, server bỏ qua
+    frame mới thay vì xếp hàng -> client chậm luôn nhận frame mới nhất.
+    """
+    fps = request.args.get("fps", type=float)
+    fps = fps if fps and fps > 0 else None
+    quality = request.args.get("q", type=int)
+    width = request.args.get("w", type=int)
+    overlay = request.args.get("overlay", "1") != "0"
+
+    STREAM_CLIENTS.inc()
+    inflight = {}  # seq -> thời điểm gửi
+    last_seq = -1
+    last_sent = 0.0
+    rate = None
+    try:
+        while True:
+            # Đọc hết ack đang chờ (không chặn)
+            while True:
+                msg = ws.receive(timeout=0)
+                if msg is None:
+                    break
+                try:
+                    acked = int(msg) % 2 ** 32
+                except ValueError:
+                    continue
+                # Ack tích lũy: client đã hiển thị (hoặc bỏ qua) mọi frame <= acked
+                sent_at = inflight.pop(acked, None)
+                for key in [k for k in inflight if (acked - k) % 2 ** 32 < 2 ** 31]:
+                    del inflight[key]
+                if sent_at is not None and rate is not None:
+                    # Thời gian gửi -> client hiển thị xong (trừ RTT nền trong AckRate)
+                    downshifts = rate.downshifts
+                    rate.record_ack(time.monotonic() - sent_at)
+                    if rate.downshifts != downshifts:
+                        STREAM_DOWNSHIFTS.inc()
+
+            now = time.monotonic()
+            for key in [k for k, t in inflight.items() if now - t > WS_ACK_TIMEOUT]:
+                del inflight[key]
+
+            _, _, _, seq, _ = get_latest_frame()
+            due = fps is None or time.monotonic() - last_sent >= 1.0 / fps
+            if seq == last_seq or not due or latest_width == 0:
+                time.sleep(STREAM_POLL)
+                continue
+
+            if len(inflight) >= WS_MAX_INFLIGHT:
+                WS_FRAMES_SKIPPED.inc()
+                last_seq = seq
+                time.sleep(STREAM_POLL)
+                continue
+
+            if rate is None:
+                rate = AckRate(*quantize(quality, width, latest_width), latest_width, fps=fps)
+
+            latest = get_latest_jpeg(*rate.variant(), overlay=overlay)
+            if latest is None:
+                time.sleep(STREAM_POLL)
+                continue
+
+            last_seq, jpeg, frame_time = latest
+            last_sent = time.monotonic()
+            inflight[last_seq % 2 ** 32] = last_sent
+            ws.send(WS_FRAME_HEADER.pack(last_seq % 2 ** 32, frame_time, 0) + jpeg)
+            STREAM_BYTES["ws"].inc(WS_FRAME_HEADER.size + len(jpeg))
+    finally:
+        STREAM_CLIENTS.dec()
+
+
+if sock is not None:
+    sock.route("/ws/video")(ws_video)
+
+
+# ===============================
+# H.264 STREAM (FRAGMENTED MP4, VIEWER TỪ XA)
+# ===============================
+# ffmpeg/libx264 chỉ chạy khi có viewer /stream.mp4; MJPEG vẫn dùng cho LAN
+FFMPEG = os.environ.get("PET_FFMPEG", "ffmpeg")
+H264_FPS = 15
+H264_WIDTH = 640
+H264_BITRATE = "600k"
+H264_FRAGMENT_MS = 200      # độ dài tối đa 1 fragment (độ trễ tối thiểu)
+
+
+def get_clean_frame():
+    """Frame BGR mới nhất không overlay (client vẽ box từ /detections)."""
+    frame, jpeg, _, _, _ = get_latest_frame()
+    if frame is None and jpeg is not None:
+        frame = decode_bgr(jpeg)
+    return frame
+
+
+h264_stream = H264Stream(get_clean_frame, fps=H264_FPS, width=H264_WIDTH, bitrate=H264_BITRATE,
+                         fragment_ms=H264_FRAGMENT_MS, ffmpeg=FFMPEG)
+
+
+def gen_h264():
+    h264_stream.open_viewer()
+    STREAM_CLIENTS.inc()
+    try:
+        deadline = time.monotonic() + 10
+        generation, init = h264_stream.init_segment()
+        while init is None:
+            if time.monotonic() > deadline or not h264_stream.alive(generation):
+                return
+            time.sleep(STREAM_POLL)
+            generation, init = h264_stream.init_segment()
+        yield init
+
+        # Bắt đầu từ keyframe mới nhất, sau đó gửi từng fragment khi có
+        index = None
+        while h264_stream.alive(generation):
+            fragments = h264_stream.fragments_since(index)
+            if not fragments:
+                time.sleep(STREAM_POLL)
+                continue
+
+            for _, _, data in fragments:
+                yield data
+                STREAM_BYTES["h264"].inc(len(data))
+            index = fragments[-1][0] + 1
+        # ffmpeg đã dừng / khởi động lại (init segment mới) -> kết thúc response,
+        # client kết nối lại
+    finally:
+        h264_stream.close_viewer()
+        STREAM_CLIENTS.dec()
+
+
+@app.route("/stream.mp4")
+def stream_mp4():
+    if not h264_stream.available:
+        abort(503)
+    return Response(gen_h264(), mimetype="video/mp4", headers={"Cache-Control": "no-cache"})
+
+
+# ===============================
+# SNAPSHOT (ẢNH TĨNH + ETAG)
+# ===============================
+def get_snapshot(quality=None, width=None, overlay=True):
+    """Snapshot hiện tại của variant; chỉ lấy frame mới khi cảnh thay đổi."""
+    key = (quality, width, overlay)
+    now = time.time()
+
+    with snapshots_lock:
+        snap = snapshots.get(key)
+        if snap is not None:
+            age = now - snap["ts"]
+            moved = last_motion_time > snap["ts"]
+            if age < SNAPSHOT_MIN_INTERVAL or (age < SNAPSHOT_MAX_AGE and not moved):
+                return snap
+
+    # Dùng chung cache encode với /video_feed -> thường không phải encode thêm
+    latest = get_latest_jpeg(quality, width, overlay)
+    if latest is None:
+        return None
+
+    seq, jpeg, _ = latest
+    snap = {"etag": f'"{seq}-{quality or 0}-{width or 0}-{int(overlay)}"', "jpeg": jpeg, "ts": now}
+    with snapshots_lock:
+        snapshots[key] = snap
+    return snap
+
+
+@app.route("/snapshot.jpg")
+def snapshot():
+    # /snapshot.jpg?w=320&q=70&overlay=0 (cam=0: hiện chỉ có 1 camera)
+    if request.args.get("cam", default=0, type=int) != 0:
+        abort(404)
+
+    frame, jpeg, _, _, _ = get_latest_frame()
+    if frame is None and jpeg is None:
+        abort(503)
+
+    quality, width = quantize(request.args.get("q", type=int),
+                              request.args.get("w", type=int), latest_width)
+    snap = get_snapshot(quality, width, request.args.get("overlay", "1") != "0")
+    if snap is None:
+        abort(503)
+
+    headers = {
+        "ETag": snap["etag"],
+        "Cache-Control": f"private, max-age={SNAPSHOT_MIN_INTERVAL}, must-revalidate",
+    }
+    if snap["etag"] in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+
+    return Response(snap["jpeg"], mimetype="image/jpeg", headers=headers)
+
+
 # ===============================
 # DASHBOARD API
 # ===============================
 @app.route("/sensor_status")
 def sensor_status():
-    return jsonify({
-        "pir": last_pir,
-        "rfid": last_rfid,
-        "pet_detected": pet_detected_flag,
-        "behavior_score": behavior_score
-    })
+    # /sensor_status?wait=30&since=<version>: long-poll, trả về ngay khi version đổi
+    wait = request.args.get("wait", type=float)
+    since = request.args.get("since", type=int)
+    if wait and since is not None:
+        snap, body = sensor_store.wait(since, min(wait, STATUS_MAX_WAIT))
+    else:
+        snap, body = sensor_store.get()
+
+    # JSON đã serialize sẵn cho version hiện tại -> không tốn công mỗi request
+    headers = {"ETag": f'"{snap.version}"', "Cache-Control": "no-cache"}
+    if headers["ETag"] in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
 
 
 @app.route("/camera_status")
@@ -267,28 +935,270 @@ def camera_status():
 
 @app.route("/motion_stats")
 def motion_stats():
-    if not os.path.exists(LOG_FILE):
-        return jsonify([])
-
-    stats = {}
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            minute = line.split(" - ")[0][:5]
-            stats[minute] = stats.get(minute, 0) + 1
-
-    return jsonify([
-        {"time": k, "count": v}
-        for k, v in sorted(stats.items())
-    ])
+    # /motion_stats?since=HH:MM&epoch=<epoch>: chỉ các phút >= since (phút cuối có thể đã tăng)
+    since = request.args.get("since")
+    with motion_stats_lock:
+        epoch = motion_stats_epoch
+        stats = sorted(motion_stats_counts.items())
+
+    if since is None:
+        return jsonify([
+            {"time": k, "count": v}
+            for k, v in stats
+        ])
+
+    reset = request.args.get("epoch", type=int) != epoch
+    if not reset:
+        stats = [(k, v) for k, v in stats if k >= since]
+    return jsonify({
+        "epoch": epoch,
+        "reset": reset,
+        "points": [{"time": k, "count": v} for k, v in stats],
+    })
 
 
 @app.route("/get_logs")
 def get_logs():
+    # /get_logs?since=<byte offset>&epoch=<epoch>: chỉ các dòng ghi sau offset
+    since = request.args.get("since", type=int)
+    epoch = log_epoch
+
     if not os.path.exists(LOG_FILE):
-        return jsonify([])
+        if since is None:
+            return jsonify([])
+        return jsonify({"epoch": epoch, "next": 0, "reset": True, "lines": []})
+
+    if since is None:
+        with open(LOG_FILE, "r", encoding="utf-8") as f:
+            return jsonify([line.strip() for line in f])
+
+    with open(LOG_FILE, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        reset = request.args.get("epoch", type=int) != epoch or not 0 <= since <= size
+        offset = 0 if reset else since
+        f.seek(offset)
+        data = f.read(size - offset)
+
+    # Chỉ lấy các dòng đã ghi xong
+    end = data.rfind(b"\n") + 1
+    return jsonify({
+        "epoch": epoch,
+        "next": offset + end,
+        "reset": reset,
+        "lines": [line.strip() for line in data[:end].decode("utf-8").splitlines()],
+    })
+
+
+@app.route("/metrics")
+def metrics():
+    cpu = os.times()
+    PROCESS_CPU.set(cpu.user + cpu.system)
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+# ===============================
+# CLIPS API
+# ===============================
+@app.route("/clips")
+def clips():
+    since = request.args.get("since", type=float)
+    until = request.args.get("until", type=float)
+    limit = request.args.get("limit", default=100, type=int)
+    return jsonify(recorder.index.clips(since, until, limit))
+
+
+@app.route("/clips/<clip_id>")
+def clip_detail(clip_id):
+    segments = recorder.index.segments(clip_id)
+    if not segments:
+        abort(404)
+
+    t = request.args.get("t", type=float)
+    if t is None:
+        return jsonify(segments)
+
+    # Seek: trả về segment chứa thời điểm t + offset trong file
+    found = recorder.index.seek(clip_id, t)
+    if found is None:
+        abort(404)
+
+    seg, offset = found
+    return jsonify({
+        "segment": seg,
+        "url": f"/clips/file/{seg['file']}#t={offset:.2f}",
+        "offset": offset,
+    })
 
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        return jsonify([line.strip() for line in f])
+
+@app.route("/clips/file/<path:name>")
+def clip_file(name):
+    # conditional=True: hỗ trợ Range request để trình duyệt tua video
+    return send_from_directory(CLIP_DIR, name, conditional=True)
+
+
+# ===============================
+# SERVER-SENT EVENTS
+# ===============================
+SSE_POLL = 0.25        # giây
+SSE_HEARTBEAT = 15     # giây
+
+
+def gen_events():
+    # Poll hàng đợi thay vì chờ Condition để không chặn event loop của gevent
+    sub = bus.subscribe(maxsize=64)
+    last_sent = time.monotonic()
+    try:
+        while True:
+            events = sub.drain()
+            if not events:
+                if time.monotonic() - last_sent >= SSE_HEARTBEAT:
+                    # Heartbeat để phát hiện client đã ngắt
+                    last_sent = time.monotonic()
+                    yield ": ping\n\n"
+                time.sleep(SSE_POLL)
+                continue
+
+            last_sent = time.monotonic()
+            yield "".join(
+                f"event: {event.kind}\ndata: {json.dumps(event.to_dict(), ensure_ascii=False)}\n\n"
+                for event in events)
+    finally:
+        sub.close()
+
+
+@app.route("/events")
+def events():
+    return Response(gen_events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
+
+# ===============================
+# DETECTIONS (BOX CHO OVERLAY PHÍA CLIENT)
+# ===============================
+DETECTIONS_MAX_FPS = 15
+
+
+def gen_detections(fps):
+    # Chỉ gửi khi box thay đổi; seq / ts để client biết box thuộc frame nào
+    last = None
+    last_sent = 0.0
+    while True:
+        _, _, overlay, seq, frame_time = get_latest_frame()
+        now = time.monotonic()
+        if overlay == last or now - last_sent < 1.0 / fps:
+            if now - last_sent >= SSE_HEARTBEAT:
+                last_sent = now
+                yield ": ping\n\n"
+            time.sleep(STREAM_POLL)
+            continue
+
+        last, last_sent = overlay, now
+        data = {"seq": seq, "ts": round(frame_time, 3), "w": latest_width, **overlay.to_dict()}
+        yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route("/detections")
+def detections():
+    # /detections?fps=5 — box motion / pet theo tọa độ frame gốc (rộng `w` px)
+    fps = request.args.get("fps", default=DETECTIONS_MAX_FPS, type=float)
+    fps = min(DETECTIONS_MAX_FPS, fps) if fps and fps > 0 else DETECTIONS_MAX_FPS
+    return Response(gen_detections(fps), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
+
+# ===============================
+# SETTINGS API
+# ===============================
+@app.route("/settings", methods=["GET", "POST"])
+def settings_api():
+    if request.method == "GET":
+        return jsonify(settings.current.to_dict())
+
+    # JSON hoặc form (settings.js); chỉ các khóa gửi lên bị thay đổi
+    data = request.get_json(silent=True)
+    if data is None:
+        data = request.form.to_dict()
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "error": "cần object JSON"}), 400
+    if not data:
+        return jsonify({"status": "error", "error": "không có thiết lập nào được gửi"}), 400
+
+    try:
+        new = settings.update(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    except OSError as e:
+        return jsonify({"status": "error", "error": f"không ghi được {SETTINGS_FILE}: {e}"}), 500
+
+    log_event(f"Cập nhật cấu hình: {', '.join(sorted(data))}")
+    return jsonify({"status": "success", "settings": new.to_dict()})
+
+
+@app.route("/settings/edit")
+def settings_page():
+    return render_template("settings.html", settings=settings.current.to_dict(),
+                           profiles={name: p.to_dict() for name, p in PROFILES.items()})
+
+
+@app.route("/detect_profiles")
+def detect_profiles():
+    return jsonify({
+        "current": settings.current.detect_profile,
+        "profiles": {name: p.to_dict() for name, p in PROFILES.items()},
+    })
+
+
+# ===============================
+# COMPRESSION + STATIC ASSETS
+# ===============================
+COMPRESS_MIN_SIZE = 1024    # byte, JSON nhỏ hơn thì nén không đáng
+COMPRESS_MIMETYPES = ("application/json",)
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+assets = StaticAssets(app.static_folder)
+
+
+@app.context_processor
+def inject_asset_url():
+    # Template: {{ asset_url('js/dashboard.js') }} -> /assets/js/dashboard.<hash>.js
+    return {"asset_url": assets.url}
+
+
+@app.after_request
+def compress_response(response):
+    # Bỏ qua stream (MJPEG, SSE, fMP4) và file (send_from_directory)
+    if (response.is_streamed or response.direct_passthrough or response.status_code != 200
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or "Content-Encoding" in response.headers):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = negotiate(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@app.route("/assets/<path:name>")
+def asset(name):
+    found = assets.get(name, request.headers.get("Accept-Encoding", ""))
+    if found is None:
+        abort(404)
+
+    body, encoding, mimetype = found
+    response = Response(body, mimetype=mimetype)
+    response.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE}, immutable"
+    response.vary.add("Accept-Encoding")
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    return response
 
 
 @app.route("/")
@@ -299,12 +1209,37 @@ def index():
 # ===============================
 # MAIN
 # ===============================
-if __name__ == "__main__":
-    print("🚀 SYSTEM MODE D — Mèo của Vân + Daily Reset + Stable Detection")
+_background_started = False
+_background_lock = threading.Lock()
+
+
+def start_background():
+    """Khởi động pipeline capture / sensor / consumer đúng 1 lần mỗi process."""
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+
     init_camera()
+    load_motion_stats()
 
+    start_event_consumers()
+    recorder.start()
     threading.Thread(target=camera_loop, daemon=True).start()
-    threading.Thread(target=arduino_simulation_loop, daemon=True).start()
+
     threading.Thread(target=daily_log_reset, daemon=True).start()
+    threading.Thread(target=settings_watch_loop, daemon=True).start()
+
+    if SENSOR_PORT:
+        SensorIngest(SENSOR_PORT, handle_sensor_event).start()
+    else:
+        threading.Thread(target=arduino_simulation_loop, daemon=True).start()
+
+
+if __name__ == "__main__":
+    # Dev server (1 thread / client). Production: python serve.py
+    print("🚀 SYSTEM MODE D — Mèo của Vân + Daily Reset + Stable Detection")
+    start_background()
 
     app.run(debug=True, threaded=True, use_reloader=False)
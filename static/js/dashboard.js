@@ -45,52 +45,126 @@ let chart = new Chart(ctx, {
 });
 
 /* ==========================================
-   FETCH MOTION STATS
+   FETCH MOTION STATS (DELTA)
 ========================================== */
+// Server chỉ trả các phút >= phút cuối đã có; epoch đổi (qua ngày) -> tải lại
+let statsCursor = { epoch: null, since: "" };
+
 function updateChart() {
-    fetch("/motion_stats")
+    const query = statsCursor.epoch === null
+        ? "since="
+        : `since=${encodeURIComponent(statsCursor.since)}&epoch=${statsCursor.epoch}`;
+
+    fetch(`/motion_stats?${query}`)
         .then(res => res.json())
         .then(data => {
-            chart.data.labels = data.map(d => d.time);
-            chart.data.datasets[0].data = data.map(d => d.count);
-            chart.update();
+            const labels = chart.data.labels;
+            const values = chart.data.datasets[0].data;
+            let changed = data.reset;
+
+            if (data.reset) {
+                labels.length = 0;
+                values.length = 0;
+            }
+
+            data.points.forEach(p => {
+                const last = labels.length - 1;
+                if (last >= 0 && labels[last] === p.time) {
+                    if (values[last] !== p.count) {
+                        values[last] = p.count;
+                        changed = true;
+                    }
+                } else {
+                    labels.push(p.time);
+                    values.push(p.count);
+                    changed = true;
+                }
+            });
+
+            statsCursor = { epoch: data.epoch, since: labels[labels.length - 1] || "" };
+            if (changed) chart.update("none");
         });
 }
 
 /* ==========================================
-   LOAD LOG ENTRIES
+   LOAD LOG ENTRIES (DELTA + VIRTUALIZED LIST)
 ========================================== */
-function loadLogs() {
-    fetch("/get_logs")
-        .then(res => res.json())
-        .then(logs => {
-            const logList = document.getElementById("logList");
-            logList.innerHTML = "";
+// Chỉ các dòng trong vùng nhìn thấy được tạo DOM; chiều cao mỗi dòng cố định
+const LOG_ROW_HEIGHT = 64;  // px, khớp .log-window .log-item trong CSS
+const LOG_OVERSCAN = 5;
 
-            logs.forEach((entry) => {
-                const div = document.createElement("div");
-                div.className = "log-item";
+const logList = document.getElementById("logList");
+const logWindow = document.createElement("div");
+logWindow.className = "log-window";
+logList.appendChild(logWindow);
 
-                const [time, msg] = entry.split(" - ");
+let logLines = [];
+let logCursor = { epoch: null, next: 0 };
+let logRange = [0, 0, 0];  // [first, last, total] đang hiển thị
 
-                div.innerHTML = `
-                    <span class="log-time">⏱ ${time}</span>
-                    <span>${msg}</span>
-                `;
+function renderLogWindow() {
+    const total = logLines.length;
+    const first = Math.max(0, Math.floor(logList.scrollTop / LOG_ROW_HEIGHT) - LOG_OVERSCAN);
+    const last = Math.min(total, first + Math.ceil(logList.clientHeight / LOG_ROW_HEIGHT) + 2 * LOG_OVERSCAN);
 
-                logList.appendChild(div);
-            });
+    if (logRange[0] === first && logRange[1] === last && logRange[2] === total) return;
+    logRange = [first, last, total];
+    logWindow.style.height = `${total * LOG_ROW_HEIGHT}px`;
+
+    const rows = document.createDocumentFragment();
+    for (let i = first; i < last; i++) {
+        const [time, msg] = logLines[i].split(" - ");
+
+        const div = document.createElement("div");
+        div.className = "log-item";
+        div.style.top = `${i * LOG_ROW_HEIGHT}px`;
+
+        const timeSpan = document.createElement("span");
+        timeSpan.className = "log-time";
+        timeSpan.textContent = `⏱ ${time}`;
+        const msgSpan = document.createElement("span");
+        msgSpan.textContent = msg;
+
+        div.append(timeSpan, " ", msgSpan);
+        rows.appendChild(div);
+    }
+    logWindow.replaceChildren(rows);
+}
+
+logList.addEventListener("scroll", () => requestAnimationFrame(renderLogWindow));
+
+// Request trước chưa xong (server chậm > 2,5s) -> bỏ lượt này, tránh 2 request
+// cùng `since` nối trùng dòng vào logLines
+let logsPending = false;
+
+function loadLogs() {
+    if (logsPending) return;
+    logsPending = true;
+
+    const query = logCursor.epoch === null
+        ? "since=0"
+        : `since=${logCursor.next}&epoch=${logCursor.epoch}`;
+
+    fetch(`/get_logs?${query}`)
+        .then(res => res.json())
+        .then(data => {
+            logCursor = { epoch: data.epoch, next: data.next };
+            if (!data.reset && data.lines.length === 0) return;
+
+            if (data.reset) logLines = [];
+            for (const line of data.lines) logLines.push(line);
+            renderLogWindow();
 
             // 🔥 FIXED: LẤY LOG MỚI NHẤT (DÒNG CUỐI)
-            if (logs.length > 0) {
-                const latestLog = logs[logs.length - 1];
-                const [latestTime] = latestLog.split(" - ");
+            if (logLines.length > 0) {
+                const [latestTime] = logLines[logLines.length - 1].split(" - ");
                 document.getElementById("lastTime").textContent = latestTime;
             }
 
-            document.getElementById("totalEvents").textContent = logs.length;
-            document.getElementById("todayCount").textContent = logs.length;
-        });
+            document.getElementById("totalEvents").textContent = logLines.length;
+            document.getElementById("todayCount").textContent = logLines.length;
+        })
+        .finally(() => { logsPending = false; });
 }
 
 /* ==========================================
@@ -113,10 +187,14 @@ function pushAlert(text) {
 /* ==========================================
    LOAD SENSOR STATUS (PIR + RFID + AI)
 ========================================== */
+// Long-poll: server chỉ trả lời khi trạng thái đổi (hoặc sau 30 giây)
+let sensorVersion = -1;
+
 function loadSensors() {
-    fetch("/sensor_status")
+    fetch(`/sensor_status?wait=30&since=${sensorVersion}`)
         .then(res => res.json())
         .then(data => {
+            sensorVersion = data.version;
             document.getElementById("pirStatus").textContent = data.pir ? "Kích hoạt" : "Không hoạt động";
             document.getElementById("rfidStatus").textContent = data.rfid || "---";
 
@@ -131,7 +209,8 @@ function loadSensors() {
             }
 
             document.getElementById("behaviorScore").textContent = data.behavior_score;
-        });
+        })
+        .then(loadSensors, () => setTimeout(loadSensors, 2500));
 }
 
 /* ==========================================
@@ -147,6 +226,144 @@ function checkCamera() {
         });
 }
 
+/* ==========================================
+   DETECTION OVERLAY (CANVAS)
+========================================== */
+let liveFeed = document.getElementById("liveFeed");
+const overlayCanvas = document.getElementById("overlayCanvas");
+const overlayCtx = overlayCanvas.getContext("2d");
+const showMotion = document.getElementById("showMotion");
+const showPets = document.getElementById("showPets");
+
+let lastDetection = null;
+
+function drawOverlay() {
+    // Canvas phủ đúng vùng ảnh (bên trong viền của <img>)
+    const w = liveFeed.clientWidth;
+    const h = liveFeed.clientHeight;
+    if (overlayCanvas.width !== w || overlayCanvas.height !== h) {
+        overlayCanvas.width = w;
+        overlayCanvas.height = h;
+        overlayCanvas.style.left = `${liveFeed.offsetLeft + liveFeed.clientLeft}px`;
+        overlayCanvas.style.top = `${liveFeed.offsetTop + liveFeed.clientTop}px`;
+    }
+    overlayCtx.clearRect(0, 0, w, h);
+
+    const d = lastDetection;
+    if (!d || !d.w) return;
+
+    // Box theo tọa độ frame gốc (rộng d.w px)
+    const s = w / d.w;
+    overlayCtx.lineWidth = 2;
+    overlayCtx.font = "bold 15px sans-serif";
+
+    if (showMotion.checked) {
+        overlayCtx.strokeStyle = "#00ff00";
+        d.motion.forEach(([x, y, bw, bh]) => overlayCtx.strokeRect(x * s, y * s, bw * s, bh * s));
+    }
+
+    if (showPets.checked) {
+        d.pets.forEach(p => {
+            const [x1, y1, x2, y2] = p.box;
+            overlayCtx.strokeStyle = "#ffc800";
+            overlayCtx.strokeRect(x1 * s, y1 * s, (x2 - x1) * s, (y2 - y1) * s);
+            overlayCtx.fillStyle = "#ffff00";
+            overlayCtx.fillText(`${p.label} ${p.conf.toFixed(2)}`, x1 * s, y1 * s - 5);
+        });
+    }
+
+    overlayCtx.fillStyle = "#00c8ff";
+    overlayCtx.fillText(`Pet: ${d.label} (${d.conf.toFixed(2)})`, 10, 24);
+}
+
+const detectionStream = new EventSource("/detections");
+detectionStream.onmessage = (e) => {
+    lastDetection = JSON.parse(e.data);
+    requestAnimationFrame(drawOverlay);
+};
+
+showMotion.addEventListener("change", drawOverlay);
+showPets.addEventListener("change", drawOverlay);
+window.addEventListener("resize", drawOverlay);
+
+// Ảnh MJPEG / video chỉ có kích thước thật khi frame đầu tiên tới -> vẽ lại
+// canvas mỗi khi liveFeed đổi kích thước, không chờ message /detections
+const feedObserver = new ResizeObserver(() => drawOverlay());
+feedObserver.observe(liveFeed);
+
+/* ==========================================
+   WEBSOCKET VIDEO (/?transport=ws)
+========================================== */
+function startWsVideo() {
+    const proto = location.protocol === "https:" ? "wss" : "ws";
+    const ws = new WebSocket(`${proto}://${location.host}/ws/video?overlay=0`);
+    ws.binaryType = "arraybuffer";
+    let shownUrl = null;
+    let pending = null;  // frame đang giải mã: { seq, url }
+
+    ws.onmessage = (e) => {
+        // Header 14 byte: uint32 seq | float64 ts | uint16 camera (big-endian)
+        const seq = new DataView(e.data).getUint32(0);
+        const url = URL.createObjectURL(new Blob([e.data.slice(14)], { type: "image/jpeg" }));
+
+        // Frame trước chưa load xong -> bỏ qua nó: giải phóng blob và ack luôn
+        // để server không giữ slot inflight tới khi hết WS_ACK_TIMEOUT
+        if (pending) {
+            URL.revokeObjectURL(pending.url);
+            ws.send(String(pending.seq));
+        }
+        pending = { seq, url };
+
+        const done = () => {
+            if (!pending || pending.seq !== seq) return;
+            pending = null;
+            if (shownUrl) URL.revokeObjectURL(shownUrl);
+            shownUrl = url;
+            ws.send(String(seq));  // ack: server chỉ gửi tiếp khi client theo kịp
+        };
+        liveFeed.onload = done;
+        liveFeed.onerror = done;  // JPEG hỏng vẫn phải ack
+        liveFeed.src = url;
+    };
+
+    // Server không có flask-sock / mất kết nối -> quay về MJPEG
+    ws.onclose = () => { liveFeed.src = "/video_feed?overlay=0"; };
+}
+
+/* ==========================================
+   H.264 VIDEO (/?transport=h264)
+========================================== */
+function startH264Video() {
+    const video = document.createElement("video");
+    video.id = "liveFeed";
+    video.muted = true;
+    video.autoplay = true;
+    video.playsInline = true;
+    video.src = "/stream.mp4";
+
+    feedObserver.unobserve(liveFeed);
+    liveFeed.replaceWith(video);
+    liveFeed = video;
+    feedObserver.observe(liveFeed);
+
+    // Trình duyệt có thể buffer vài giây -> nhảy tới cuối để giữ độ trễ thấp
+    setInterval(() => {
+        const b = video.buffered;
+        if (b.length && b.end(b.length - 1) - video.currentTime > 1) {
+            video.currentTime = b.end(b.length - 1) - 0.2;
+        }
+    }, 1000);
+
+    // ffmpeg khởi động lại / mất kết nối -> mở lại stream
+    const reconnect = () => setTimeout(() => { video.src = "/stream.mp4"; }, 2000);
+    video.onended = reconnect;
+    video.onerror = reconnect;
+}
+
+const transport = new URLSearchParams(location.search).get("transport");
+if (transport === "ws") startWsVideo();
+else if (transport === "h264") startH264Video();
+
 /* ==========================================
    AUTO REFRESH LOOP
 ========================================== */
@@ -154,8 +371,8 @@ function refreshAll() {
     updateChart();
     loadLogs();
     checkCamera();
-    loadSensors();
 }
 
 setInterval(refreshAll, 2500);
 refreshAll();
+loadSensors();
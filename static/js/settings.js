@@ -1,14 +1,23 @@
 /* ========== DARK / LIGHT MODE ========== */
 const themeBtn = document.getElementById("themeToggle");
+const themeIcon = document.getElementById("themeIcon");
+const themeText = document.getElementById("themeText");
+
+// Dùng chung theme đã lưu với dashboard
+if (localStorage.getItem("theme") === "dark") {
+    document.body.classList.add("dark");
+    themeIcon.textContent = "☀️";
+    themeText.textContent = "Light Mode";
+}
 
 themeBtn.addEventListener("click", () => {
     document.body.classList.toggle("dark");
 
-    if (document.body.classList.contains("dark")) {
-        themeBtn.textContent = "☀️ Light Mode";
-    } else {
-        themeBtn.textContent = "🌙 Dark Mode";
-    }
+    const dark = document.body.classList.contains("dark");
+    themeIcon.textContent = dark ? "☀️" : "🌙";
+    themeText.textContent = dark ? "Light Mode" : "Dark Mode";
+
+    localStorage.setItem("theme", dark ? "dark" : "light");
 });
 
 
@@ -16,13 +25,10 @@ themeBtn.addEventListener("click", () => {
 document.getElementById("settingsForm").addEventListener("submit", async (e) => {
     e.preventDefault();
 
-    let sensitivity = document.getElementById("sensitivity").value;
-    let logEnabled = document.getElementById("logEnabled").value;
-
-    let res = await fetch("/update-settings", {
+    // templates/settings.html: name của input trùng khóa của /settings
+    let res = await fetch("/settings", {
         method: "POST",
-        headers: { "Content-Type": "application/x-www-form-urlencoded" },
-        body: `sensitivity=${sensitivity}&log_enabled=${logEnabled}`
+        body: new URLSearchParams(new FormData(e.target))
     });
 
     let result = await res.json();
@@ -33,7 +39,7 @@ document.getElementById("settingsForm").addEventListener("submit", async (e) =>
         statusText.innerHTML = "✔ Lưu cấu hình thành công!";
         statusText.style.color = "#4CAF50";
     } else {
-        statusText.innerHTML = "❌ Có lỗi xảy ra!";
+        statusText.textContent = `❌ ${result.error || "Có lỗi xảy ra!"}`;
         statusText.style.color = "red";
     }
 });
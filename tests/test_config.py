@@ -0,0 +1,47 @@
+# tests/test_config.py
+
+import pytest
+
+from config import DetectorSettings, parse_settings
+
+
+def test_partial_update_and_coercion():
+    cfg = parse_settings({"pet_threshold": "0.4", "motion_min_area": "1200",
+                          "pet_classes": "dog, cat ,bird", "detect_profile": "fast"})
+    assert cfg.pet_threshold == 0.4
+    assert cfg.motion_min_area == 1200 and isinstance(cfg.motion_min_area, int)
+    assert cfg.pet_classes == ("dog", "cat", "bird")
+    assert cfg.detect_profile == "fast"
+    assert cfg.no_pet_cooldown == DetectorSettings().no_pet_cooldown
+
+    # Số nguyên gửi dạng float (JSON 800.0) vẫn hợp lệ
+    assert parse_settings({"motion_min_area": 800.0}).motion_min_area == 800
+
+
+@pytest.mark.parametrize("data", [
+    {"pet_threshold": "nan"},
+    {"pet_threshold": float("nan")},
+    {"no_pet_cooldown": "inf"},
+    {"no_pet_cooldown": float("-inf")},
+    {"pet_threshold": True},
+    {"motion_diff_threshold": False},
+    {"motion_min_area": 12.7},
+    {"motion_min_area": "12.5"},
+    {"pet_threshold": 1.5},
+    {"motion_diff_threshold": 0},
+    {"motion_min_area": -1},
+    {"pet_threshold": "abc"},
+    {"pet_threshold": None},
+    {"pet_classes": " , "},
+    {"detect_profile": "turbo"},
+    {"unknown": 1},
+])
+def test_rejects_invalid(data):
+    with pytest.raises(ValueError):
+        parse_settings(data)
+
+
+def test_known_classes():
+    assert parse_settings({"pet_classes": ["cat"]}, known_classes={"cat", "dog"}).pet_classes == ("cat",)
+    with pytest.raises(ValueError):
+        parse_settings({"pet_classes": ["dragon"]}, known_classes={"cat", "dog"})
@@ -0,0 +1,114 @@
+# tests/test_serial_ingest.py
+#
+# SensorIngest qua socket cục bộ và pty thay cho Arduino thật.
+
+import asyncio
+import os
+
+import pytest
+
+from event_bus import PirEvent, RfidEvent
+from sensors.serial_ingest import MAX_LINE, SensorIngest, parse_line
+
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("hết thời gian chờ")
+        await asyncio.sleep(0.01)
+
+
+async def stop(ingest, task):
+    ingest.stop()
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_parse_line():
+    assert parse_line("PIR:1\r\n").value == 1
+    assert parse_line("PIR:0").value == 0
+    assert parse_line("RFID: VAN_CAT_001 ").tag == "VAN_CAT_001"
+    assert parse_line("PIR:x") is None
+    assert parse_line("RFID:") is None
+    assert parse_line("HELLO") is None
+
+
+def test_socket_framing_long_line_and_reconnect():
+    async def scenario():
+        events = []
+        connections = []
+
+        async def serve(reader, writer):
+            connections.append(writer)
+            if len(connections) == 1:
+                # Dòng bị chia nhỏ, dòng quá dài, rồi ngắt kết nối
+                writer.write(b"PI")
+                await writer.drain()
+                await asyncio.sleep(0.05)
+                writer.write(b"R:1\n" + b"X" * (MAX_LINE * 8) + b"\nRFID:ABC\n")
+                await writer.drain()
+                await asyncio.sleep(0.1)
+                writer.close()
+            else:
+                writer.write(b"PIR:0\n")
+                await writer.drain()
+
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        ingest = SensorIngest(f"socket://127.0.0.1:{port}", events.append,
+                              reconnect_min=0.05, reconnect_max=0.1)
+        task = asyncio.create_task(ingest.run())
+        try:
+            await wait_for(lambda: len(events) >= 3)
+        finally:
+            await stop(ingest, task)
+            server.close()
+
+        assert [type(e) for e in events] == [PirEvent, RfidEvent, PirEvent]
+        assert (events[0].value, events[1].tag, events[2].value) == (1, "ABC", 0)
+        assert ingest.bad_lines >= 1
+        assert len(connections) == 2
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.skipif(os.name != "posix", reason="pty chỉ có trên POSIX")
+def test_pty_raw_mode_and_baudrate(monkeypatch):
+    import pty
+    import termios
+
+    from sensors import serial_ingest
+    monkeypatch.setattr(serial_ingest, "serial_asyncio", None)  # ép dùng nhánh tty
+
+    async def scenario():
+        master, slave = pty.openpty()
+        events = []
+        ingest = SensorIngest(os.ttyname(slave), events.append)
+        task = asyncio.create_task(ingest.run())
+        try:
+            await wait_for(lambda: ingest.connected)
+            os.write(master, b"PIR:1\r\nRFID:TAG\r\n")
+            await wait_for(lambda: len(events) >= 2)
+
+            attrs = termios.tcgetattr(slave)
+            assert not attrs[3] & termios.ECHO
+            assert not attrs[3] & termios.ICANON
+            assert attrs[4] == attrs[5] == termios.B115200
+
+            # Raw mode: Arduino không nhận lại dòng vừa gửi
+            os.set_blocking(master, False)
+            with pytest.raises(BlockingIOError):
+                os.read(master, 64)
+        finally:
+            await stop(ingest, task)
+            os.close(master)
+            os.close(slave)
+
+        assert events[0].value == 1 and events[1].tag == "TAG"
+
+    asyncio.run(scenario())
@@ -0,0 +1,72 @@
+# tools/bench_encode.py
+#
+# So sánh thời gian encode và kích thước JPEG theo backend / quality / subsampling:
+#   python -m tools.bench_encode
+#   python -m tools.bench_encode --source clip.mp4 --frames 200 --qualities 50 70 90
+
+import argparse
+import time
+
+from metrics import Histogram
+from video.encoder import OpenCVEncoder, TurboJPEGEncoder
+from video.sources import open_source
+
+
+def load_frames(spec, count):
+    source = open_source(spec)
+    frames = []
+    while len(frames) < count:
+        ok, frame = source.read()
+        if not ok:
+            break
+        frames.append(frame)
+    source.release()
+    return frames
+
+
+def available_backends(subsampling, fast_dct):
+    backends = [OpenCVEncoder(subsampling, fast_dct)]
+    try:
+        backends.append(TurboJPEGEncoder(subsampling, fast_dct))
+    except (RuntimeError, OSError) as e:
+        print(f"⚠️ Bỏ qua turbojpeg ({subsampling}): {str(e).splitlines()[0]}")
+    return backends
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JPEG encoder")
+    parser.add_argument("--source", default="synthetic://640x480@30",
+                        help="Video, thư mục ảnh hoặc synthetic://WxH@fps")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--qualities", type=int, nargs="+", default=[50, 60, 70, 80, 90])
+    parser.add_argument("--subsampling", nargs="+", default=["420", "444"])
+    parser.add_argument("--no-fast-dct", action="store_true")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        raise SystemExit(f"❌ Không đọc được frame từ {args.source}")
+
+    h, w = frames[0].shape[:2]
+    print(f"\n📊 {len(frames)} frame {w}x{h} từ {args.source}")
+    print(f"   {'backend':<11}{'sub':>5}{'q':>5}{'mean ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'KB':>8}")
+
+    for subsampling in args.subsampling:
+        for encoder in available_backends(subsampling, not args.no_fast_dct):
+            for quality in args.qualities:
+                encoder(frames[0], quality)  # warm-up
+                hist = Histogram()
+                size = 0
+                for frame in frames:
+                    t0 = time.perf_counter()
+                    jpeg = encoder(frame, quality)
+                    hist.observe(time.perf_counter() - t0)
+                    size += len(jpeg)
+
+                print(f"   {encoder.name:<11}{subsampling:>5}{quality:>5}"
+                      f"{hist.sum / hist.count * 1000:>9.2f}{hist.percentile(50) * 1000:>9.2f}"
+                      f"{hist.percentile(99) * 1000:>9.2f}{size / len(frames) / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# tools/bench_profiles.py
+#
+# So sánh độ trễ / recall của các profile suy luận (ai/profiles.py) trên video pet ghi sẵn:
+#   python -m tools.bench_profiles clip.mp4 --frames 300
+#   python -m tools.bench_profiles frames_dir/ --labels pet_frames.txt --json report.json
+#
+# --labels: mỗi dòng 1 frame index hoặc khoảng "a-b" có pet (tính từ 0). Không có
+# --labels thì lấy kết quả của profile --reference làm chuẩn (recall tương đối).
+
+import argparse
+import json
+import time
+
+from ultralytics import YOLO
+
+from ai.profiles import PROFILES
+from metrics import Histogram
+from tools.bench_encode import load_frames
+
+
+def load_labels(path):
+    frames = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            start, _, end = line.partition("-")
+            frames.update(range(int(start), int(end or start) + 1))
+    return frames
+
+
+def run_profile(model, frames, profile, labels, conf):
+    class_ids = sorted(i for i, name in model.names.items() if name in labels)
+    kwargs = profile.predict_kwargs(class_ids)
+    model.predict(frames[0], conf=conf, verbose=False, **kwargs)  # warm-up
+
+    hist = Histogram()
+    hits = set()
+    for i, frame in enumerate(frames):
+        t0 = time.perf_counter()
+        results = model.predict(frame, conf=conf, verbose=False, **kwargs)
+        hist.observe(time.perf_counter() - t0)
+        if any(len(r.boxes) for r in results):
+            hits.add(i)
+    return hist, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark profile suy luận YOLO")
+    parser.add_argument("source", help="Video, thư mục ảnh hoặc synthetic://WxH@fps")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--classes", nargs="+", default=["dog", "cat"])
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--labels", help="File frame index có pet (ground truth)")
+    parser.add_argument("--reference", default="accurate", choices=list(PROFILES),
+                        help="Profile làm chuẩn khi không có --labels")
+    parser.add_argument("--json", help="Ghi báo cáo ra file JSON")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        raise SystemExit(f"❌ Không đọc được frame từ {args.source}")
+
+    model = YOLO(args.model)
+    runs = {}
+    names = list(args.profiles)
+    if args.labels is None and args.reference not in names:
+        names.insert(0, args.reference)
+    for name in names:
+        profile = PROFILES[name]
+        runs[name] = run_profile(model, frames, profile, profile.classes or args.classes, args.conf)
+
+    truth = load_labels(args.labels) if args.labels else runs[args.reference][1]
+    truth &= set(range(len(frames)))
+
+    h, w = frames[0].shape[:2]
+    print(f"\n📊 {len(frames)} frame {w}x{h} từ {args.source}, {args.model}, conf {args.conf:g}, "
+          f"{len(truth)} frame có pet ({'--labels' if args.labels else 'chuẩn: ' + args.reference})")
+    print(f"   {'profile':<10}{'imgsz':>6}{'max_det':>8}{'prec':>5}{'iou':>5}"
+          f"{'mean ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'recall':>8}{'extra':>7}")
+
+    report = {"source": args.source, "frames": len(frames), "model": args.model,
+              "conf": args.conf, "positives": len(truth), "profiles": {}}
+    for name in names:
+        profile = PROFILES[name]
+        hist, hits = runs[name]
+        recall = len(hits & truth) / len(truth) if truth else None
+        row = {
+            **profile.to_dict(),
+            "mean_ms": hist.sum / hist.count * 1000,
+            "p50_ms": hist.percentile(50) * 1000,
+            "p99_ms": hist.percentile(99) * 1000,
+            "recall": recall,
+            "extra_frames": len(hits - truth),  # frame có detection nhưng không có pet
+        }
+        report["profiles"][name] = row
+        print(f"   {name:<10}{profile.imgsz:>6}{profile.max_det:>8}{profile.precision:>5}"
+              f"{profile.iou:>5.2f}{row['mean_ms']:>9.1f}{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+              f"{recall if recall is not None else float('nan'):>8.2f}{row['extra_frames']:>7}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# tools/bench_replay.py
+#
+# Benchmark camera_loop() trên video ghi sẵn, không cần webcam:
+#   python -m tools.bench_replay clip.mp4 --script pir.txt --json report.json
+#   python -m tools.bench_replay frames_dir/ --realtime
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from event_bus import PetEvent
+from sensors.serial_ingest import parse_line
+from video.sources import ReplaySource, load_sensor_script
+
+
+def run(source_path, script_path=None, realtime=False, record=False):
+    import server
+
+    fd, log_path = tempfile.mkstemp(prefix="bench_log_", suffix=".txt")
+    os.close(fd)
+    server.LOG_FILE = log_path
+    server.CAMERA_LOOP_SLEEP = 0
+
+    def on_line(line):
+        event = parse_line(line)
+        if event is not None:
+            server.handle_sensor_event(event)
+
+    script = load_sensor_script(script_path) if script_path else []
+    source = ReplaySource(source_path, realtime=realtime, script=script, on_line=on_line)
+    if not source.isOpened():
+        raise SystemExit(f"❌ Không mở được {source_path}")
+
+    server.camera = source
+    detections = server.bus.subscribe(PetEvent, maxsize=1_000_000)
+
+    server.start_event_consumers()
+    if record:
+        server.recorder.start()
+
+    loop = threading.Thread(target=server.camera_loop, daemon=True)
+    start = time.perf_counter()
+    loop.start()
+
+    while not source.finished:
+        time.sleep(0.05)
+    wall = time.perf_counter() - start
+
+    server.camera_stop.set()
+    loop.join(timeout=5)
+    time.sleep(0.5)  # chờ log writer ghi nốt
+
+    with open(log_path, "r", encoding="utf-8") as f:
+        log_lines = sum(1 for _ in f)
+    os.remove(log_path)
+
+    frames = server.FRAMES_TOTAL.value
+    stages = {}
+    for name, hist in server.STAGE.items():
+        if hist.count == 0:
+            continue
+        stages[name] = {
+            "count": hist.count,
+            "mean_ms": hist.sum / hist.count * 1000,
+            "p50_ms": hist.percentile(50) * 1000,
+            "p90_ms": hist.percentile(90) * 1000,
+            "p99_ms": hist.percentile(99) * 1000,
+            "max_ms": hist.max * 1000,
+        }
+
+    return {
+        "source": source_path,
+        "realtime": realtime,
+        "frames": frames,
+        "wall_seconds": wall,
+        "fps": frames / wall if wall > 0 else 0.0,
+        "inferences": server.INFERENCE_TOTAL.value,
+        "detections": len(detections.drain()),
+        "log_lines": log_lines,
+        "stages": stages,
+    }
+
+
+def print_report(report):
+    print(f"\n📊 Replay: {report['source']} ({'realtime' if report['realtime'] else 'max speed'})")
+    print(f"   frames={report['frames']}  wall={report['wall_seconds']:.2f}s  fps={report['fps']:.1f}")
+    print(f"   inferences={report['inferences']}  detections={report['detections']}  "
+          f"log_lines={report['log_lines']}\n")
+
+    print(f"   {'stage':<10}{'count':>8}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, s in report["stages"].items():
+        print(f"   {name:<10}{s['count']:>8}{s['mean_ms']:>9.2f}{s['p50_ms']:>9.2f}"
+              f"{s['p90_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['max_ms']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay video qua camera_loop() và đo hiệu năng")
+    parser.add_argument("source", help="File video hoặc thư mục ảnh")
+    parser.add_argument("--script", help="Kịch bản PIR/RFID: '<giây> PIR:1' mỗi dòng")
+    parser.add_argument("--realtime", action="store_true", help="Phát đúng nhịp fps thay vì nhanh nhất")
+    parser.add_argument("--record", action="store_true", help="Bật ghi clip trong lúc replay")
+    parser.add_argument("--json", help="Ghi báo cáo ra file JSON")
+    args = parser.parse_args()
+
+    report = run(args.source, args.script, args.realtime, args.record)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# tools/bench_synthetic.py
+#
+# Load test capture -> motion -> encode -> nhiều client, chỉ dùng CPU,
+# với nguồn video tổng hợp (không cần camera):
+#   python -m tools.bench_synthetic --cameras 8 --size 1920x1080 --clients 2 --seconds 20
+#   python -m tools.bench_synthetic --motion-scale 2   # motion trên ảnh 1/2
+#   python -m tools.bench_synthetic --clients 6 --variants 3  # client xin 3 (q, w) khác nhau
+
+import argparse
+import os
+import threading
+import time
+
+from metrics import Histogram
+from video.encoder import make_encoder
+from video.motion import MotionDetector
+from video.sources import SyntheticSource
+from video.variants import VariantCache, quantize
+
+
+def client_variants(count, frame_width):
+    """`count` variant (q, w) đã quantize(): mặc định, rồi giảm dần như AdaptiveRate."""
+    variants = [quantize(None, None, frame_width)]
+    for level in range(1, count):
+        variants.append(quantize(80 - 15 * level, frame_width * 0.75 ** level, frame_width))
+    return variants
+
+
+class CameraPipeline:
+    """
+    1 camera: thread capture + motion, `clients` thread lấy JPEG qua VariantCache
+    như gen_frames() (mỗi variant encode 1 lần / frame, dùng chung cho các client).
+    """
+
+    def __init__(self, index, width, height, fps, clients, realtime, motion_scale=1,
+                 encoder=None, variants=1):
+        self.source = SyntheticSource(width=width, height=height, fps=fps,
+                                      seed=index, realtime=realtime)
+        self.motion = MotionDetector(scale=motion_scale)
+        self.clients = clients
+        self.variants = client_variants(variants, width)
+
+        self.frames = 0
+        self.motion_frames = 0
+        self.delivered = [0] * clients
+        self.bytes_sent = 0
+
+        self.read_hist = Histogram()
+        self.motion_hist = Histogram()
+        self.encode_hist = Histogram()  # chỉ các lần encode thật (cache miss)
+        self.cache = VariantCache(max_variants=8, encoder=encoder or make_encoder(),
+                                  on_encode=self.encode_hist.observe)
+
+        self._latest = None
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def capture_loop(self, stop):
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            ok, frame = self.source.read()
+            t1 = time.perf_counter()
+            if not ok:
+                break
+            self.read_hist.observe(t1 - t0)
+
+            if self.motion.update(frame):
+                self.motion_frames += 1
+            self.motion_hist.observe(time.perf_counter() - t1)
+
+            self.frames += 1
+            with self._cond:
+                self._latest = frame
+                self._seq += 1
+                self._cond.notify_all()
+
+    def client_loop(self, i, stop):
+        quality, width = self.variants[i % len(self.variants)]
+        seen = 0
+        while not stop.is_set():
+            with self._cond:
+                self._cond.wait_for(lambda: self._seq != seen or stop.is_set(), timeout=0.5)
+                if self._seq == seen:
+                    continue
+                frame, seen = self._latest, self._seq
+
+            latest = self.cache.get(frame, seen, 0.0, quality, width)
+            if latest is not None:
+                self.delivered[i] += 1
+                self.bytes_sent += len(latest[0])
+
+    def start(self, stop):
+        threads = [threading.Thread(target=self.capture_loop, args=(stop,), daemon=True)]
+        threads += [threading.Thread(target=self.client_loop, args=(i, stop), daemon=True)
+                    for i in range(self.clients)]
+        for t in threads:
+            t.start()
+        return threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test với nguồn video tổng hợp")
+    parser.add_argument("--cameras", type=int, default=1)
+    parser.add_argument("--size", default="640x480", help="WxH, vd 1920x1080")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--clients", type=int, default=1, help="Số client stream mỗi camera")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--max-speed", action="store_true", help="Không giới hạn theo fps")
+    parser.add_argument("--motion-scale", type=int, default=1, choices=(1, 2, 4, 8))
+    parser.add_argument("--variants", type=int, default=1,
+                        help="Số variant (q, w) khác nhau, chia đều cho các client")
+    parser.add_argument("--jpeg-backend", default="auto", choices=("auto", "turbojpeg", "opencv"))
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    encoder = make_encoder(args.jpeg_backend)
+    pipelines = [CameraPipeline(i, width, height, args.fps, args.clients, not args.max_speed,
+                                args.motion_scale, encoder, args.variants)
+                 for i in range(args.cameras)]
+
+    stop = threading.Event()
+    cpu0, wall0 = os.times(), time.perf_counter()
+    threads = [t for p in pipelines for t in p.start(stop)]
+
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join(timeout=2)
+
+    wall = time.perf_counter() - wall0
+    cpu1 = os.times()
+    cpu = (cpu1.user - cpu0.user) + (cpu1.system - cpu0.system)
+
+    print(f"\n📊 {args.cameras} camera {width}x{height}@{args.fps:g}, "
+          f"{args.clients} client/camera, {len(pipelines[0].variants)} variant, {encoder.name}, "
+          f"motion 1/{args.motion_scale}, {wall:.1f}s, CPU {cpu / wall * 100:.0f}%")
+    print(f"   {'cam':<5}{'fps':>7}{'motion%':>9}{'motion p50/p99':>17}"
+          f"{'encode p50/p99':>17}{'encodes/s':>11}{'client fps':>12}{'MB/s':>8}")
+
+    for i, p in enumerate(pipelines):
+        client_fps = sum(p.delivered) / len(p.delivered) / wall if p.delivered else 0
+        print(f"   {i:<5}{p.frames / wall:>7.1f}{p.motion_frames / max(1, p.frames) * 100:>9.0f}"
+              f"{p.motion_hist.percentile(50) * 1000:>9.1f}/{p.motion_hist.percentile(99) * 1000:<7.1f}"
+              f"{p.encode_hist.percentile(50) * 1000:>9.1f}/{p.encode_hist.percentile(99) * 1000:<7.1f}"
+              f"{p.encode_hist.count / wall:>11.1f}{client_fps:>12.1f}{p.bytes_sent / wall / 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# tools/load_test.py
+#
+# Đo khả năng phục vụ của server với nhiều viewer / tab dashboard:
+#   python -m tools.load_test http://localhost:5000 --streams 10 --pollers 20 --seconds 30
+#
+# - N client MJPEG đọc /video_feed: fps nhận được, bytes/s, độ trễ frame
+#   (now - X-Timestamp, cần server và client cùng đồng hồ)
+# - M poller gọi /sensor_status, /get_logs, /motion_stats mỗi 2.5s như dashboard
+# - CPU server đọc từ /metrics (pet_process_cpu_seconds)
+
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlparse
+
+from metrics import Histogram
+
+POLL_PATHS = ("/sensor_status", "/get_logs", "/motion_stats")
+
+
+def _connect(base, timeout=10):
+    url = urlparse(base)
+    cls = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    return cls(url.hostname, url.port or (443 if url.scheme == "https" else 80), timeout=timeout)
+
+
+def read_server_cpu(base):
+    try:
+        conn = _connect(base)
+        conn.request("GET", "/metrics")
+        body = conn.getresponse().read().decode()
+        conn.close()
+    except OSError:
+        return None
+
+    for line in body.splitlines():
+        if line.startswith("pet_process_cpu_seconds "):
+            return float(line.split()[1])
+    return None
+
+
+class StreamClient:
+    def __init__(self, base, path="/video_feed"):
+        self.base = base
+        self.path = path
+        self.frames = 0
+        self.bytes = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+    def run(self, stop):
+        while not stop.is_set():
+            try:
+                conn = _connect(self.base)
+                conn.request("GET", self.path)
+                resp = conn.getresponse()
+                self._read_parts(resp, stop)
+                conn.close()
+            except (OSError, http.client.HTTPException, ValueError):
+                self.errors += 1
+                time.sleep(0.5)
+
+    def _read_parts(self, resp, stop):
+        while not stop.is_set():
+            line = resp.readline()
+            if not line:
+                return
+            if not line.startswith(b"--"):
+                continue
+
+            headers = {}
+            while True:
+                h = resp.readline()
+                if not h or h in (b"\r\n", b"\n"):
+                    break
+                key, _, value = h.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length <= 0:
+                raise ValueError("multipart part thiếu Content-Length")
+
+            body = resp.read(length)
+            now = time.time()
+            self.frames += 1
+            self.bytes += len(body)
+
+            stamp = float(headers.get("x-timestamp", 0) or 0)
+            if stamp > 0:
+                self.latency.observe(max(0.0, now - stamp))
+
+
+class Poller:
+    def __init__(self, base, interval):
+        self.base = base
+        self.interval = interval
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency = Histogram()
+
+    def run(self, stop):
+        conn = None
+        while not stop.is_set():
+            start = time.perf_counter()
+            for path in POLL_PATHS:
+                t0 = time.perf_counter()
+                try:
+                    conn = conn or _connect(self.base)
+                    conn.request("GET", path)
+                    body = conn.getresponse().read()
+                    self.bytes += len(body)
+                    self.requests += 1
+                    self.latency.observe(time.perf_counter() - t0)
+                except (OSError, http.client.HTTPException):
+                    self.errors += 1
+                    conn = None
+            stop.wait(max(0.0, self.interval - (time.perf_counter() - start)))
+
+
+def _merge(hists):
+    merged = Histogram()
+    for h in hists:
+        for i, c in enumerate(h.counts):
+            merged.counts[i] += c
+        merged.count += h.count
+        merged.sum += h.sum
+        merged.max = max(merged.max, h.max)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /video_feed và API dashboard")
+    parser.add_argument("base", nargs="?", default="http://localhost:5000")
+    parser.add_argument("--streams", type=int, default=5, help="Số client MJPEG")
+    parser.add_argument("--pollers", type=int, default=10, help="Số tab dashboard giả lập")
+    parser.add_argument("--interval", type=float, default=2.5, help="Chu kỳ poll (giây)")
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    streams = [StreamClient(args.base) for _ in range(args.streams)]
+    pollers = [Poller(args.base, args.interval) for _ in range(args.pollers)]
+
+    stop = threading.Event()
+    cpu0 = read_server_cpu(args.base)
+    wall0 = time.perf_counter()
+
+    threads = [threading.Thread(target=c.run, args=(stop,), daemon=True) for c in streams + pollers]
+    for t in threads:
+        t.start()
+
+    time.sleep(args.seconds)
+    stop.set()
+    wall = time.perf_counter() - wall0
+    cpu1 = read_server_cpu(args.base)
+
+    print(f"\n📊 {args.base}: {args.streams} stream, {args.pollers} poller, {wall:.1f}s")
+
+    if streams:
+        print(f"\n   {'stream':<8}{'fps':>7}{'KB/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for i, c in enumerate(streams):
+            print(f"   {i:<8}{c.frames / wall:>7.1f}{c.bytes / wall / 1024:>10.1f}"
+                  f"{c.latency.percentile(50) * 1000:>9.1f}{c.latency.percentile(99) * 1000:>9.1f}"
+                  f"{c.errors:>8}")
+        lat = _merge(c.latency for c in streams)
+        total_fps = sum(c.frames for c in streams) / wall
+        total_bytes = sum(c.bytes for c in streams) / wall
+        print(f"   {'total':<8}{total_fps:>7.1f}{total_bytes / 1024:>10.1f}"
+              f"{lat.percentile(50) * 1000:>9.1f}{lat.percentile(99) * 1000:>9.1f}"
+              f"{sum(c.errors for c in streams):>8}")
+
+    if pollers:
+        lat = _merge(p.latency for p in pollers)
+        reqs = sum(p.requests for p in pollers)
+        print(f"\n   poll: {reqs / wall:.1f} req/s, {sum(p.bytes for p in pollers) / wall / 1024:.1f} KB/s, "
+              f"p50 {lat.percentile(50) * 1000:.1f} ms, p99 {lat.percentile(99) * 1000:.1f} ms, "
+              f"errors {sum(p.errors for p in pollers)}")
+
+    if cpu0 is not None and cpu1 is not None:
+        print(f"\n   server CPU: {(cpu1 - cpu0) / wall * 100:.0f}%")
+    else:
+        print("\n   server CPU: không đọc được /metrics")
+
+
+if __name__ == "__main__":
+    main()
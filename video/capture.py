@@ -0,0 +1,58 @@
+# video/capture.py
+#
+# Chế độ pass-through MJPEG: camera trả về JPEG gốc (CONVERT_RGB=0), stream
+# gửi thẳng cho viewer, chỉ giải mã khi phân tích cần.
+
+import struct
+
+import cv2
+import numpy as np
+
+GRAY_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+# SOF0..SOF15 trừ DHT (C4), JPG (C8), DAC (CC)
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def enable_mjpeg(cam):
+    """Yêu cầu camera gửi MJPEG và không giải mã trong OpenCV."""
+    ok = cam.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    return bool(ok and cam.set(cv2.CAP_PROP_CONVERT_RGB, 0))
+
+
+def is_jpeg_packet(frame):
+    """True nếu camera.read() trả về buffer JPEG 1 chiều thay vì ảnh BGR."""
+    if frame is None or frame.ndim > 2 or (frame.ndim == 2 and frame.shape[0] != 1):
+        return False
+    return frame.size > 4 and frame.flat[0] == 0xFF and frame.flat[1] == 0xD8
+
+
+def decode_bgr(jpeg):
+    return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+def decode_gray(jpeg, scale=1):
+    """Giải mã thẳng ra ảnh xám; scale 2/4/8 dùng DCT thu nhỏ của libjpeg."""
+    return cv2.imdecode(np.frombuffer(jpeg, np.uint8), GRAY_FLAGS[scale])
+
+
+def jpeg_size(jpeg):
+    """(width, height) đọc từ header SOF, không giải mã; None nếu không tìm thấy."""
+    i = 2
+    while i + 9 <= len(jpeg):
+        if jpeg[i] != 0xFF:
+            return None
+        marker = jpeg[i + 1]
+        if marker == 0xFF:  # byte đệm
+            i += 1
+            continue
+        if marker in SOF_MARKERS:
+            height, width = struct.unpack(">HH", jpeg[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack(">H", jpeg[i + 2:i + 4])[0]
+    return None
@@ -0,0 +1,69 @@
+# video/encoder.py
+
+import cv2
+
+try:
+    from turbojpeg import (TurboJPEG, TJPF_BGR, TJSAMP_444, TJSAMP_422,
+                           TJSAMP_420, TJFLAG_FASTDCT)
+except ImportError:  # PyTurboJPEG là tùy chọn
+    TurboJPEG = None
+
+DEFAULT_QUALITY = 95  # giống mặc định của cv2.imencode
+
+
+class OpenCVEncoder:
+    name = "opencv"
+
+    SUBSAMPLING = {
+        "444": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_444", None),
+        "422": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_422", None),
+        "420": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_420", None),
+    }
+
+    def __init__(self, subsampling="420", fast_dct=True):
+        self.params = []
+        factor = self.SUBSAMPLING.get(subsampling)
+        # OpenCV < 4.5.5 không có tham số sampling factor
+        if factor is not None and hasattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR"):
+            self.params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, factor]
+        # OpenCV không cho chọn DCT, fast_dct bị bỏ qua
+
+    def __call__(self, frame, quality=None):
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality or DEFAULT_QUALITY] + self.params
+        ok, buffer = cv2.imencode(".jpg", frame, params)
+        return buffer.tobytes() if ok else None
+
+
+class TurboJPEGEncoder:
+    """libjpeg-turbo qua PyTurboJPEG: SIMD, chroma subsampling, fast DCT."""
+
+    name = "turbojpeg"
+
+    def __init__(self, subsampling="420", fast_dct=True, lib_path=None):
+        if TurboJPEG is None:
+            raise RuntimeError("PyTurboJPEG chưa được cài")
+
+        self.jpeg = TurboJPEG(lib_path) if lib_path else TurboJPEG()
+        self.subsample = {"444": TJSAMP_444, "422": TJSAMP_422, "420": TJSAMP_420}[subsampling]
+        self.flags = TJFLAG_FASTDCT if fast_dct else 0
+
+    def __call__(self, frame, quality=None):
+        return self.jpeg.encode(frame, quality=quality or DEFAULT_QUALITY,
+                                pixel_format=TJPF_BGR, jpeg_subsample=self.subsample,
+                                flags=self.flags)
+
+
+def make_encoder(backend="auto", subsampling="420", fast_dct=True):
+    """
+    backend: "auto" (turbojpeg nếu có, không thì opencv) | "turbojpeg" | "opencv".
+    Trả về callable(frame, quality) -> jpeg bytes.
+    """
+    if backend in ("auto", "turbojpeg"):
+        try:
+            return TurboJPEGEncoder(subsampling, fast_dct)
+        except (RuntimeError, OSError) as e:
+            if backend == "turbojpeg":
+                raise
+            print(f"⚠️ TurboJPEG không khả dụng ({e}), dùng OpenCV")
+
+    return OpenCVEncoder(subsampling, fast_dct)
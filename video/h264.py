@@ -0,0 +1,253 @@
+# video/h264.py
+#
+# Stream H.264 độ trễ thấp cho viewer từ xa: 1 tiến trình ffmpeg/libx264
+# (ultrafast + zerolatency) encode frame mới nhất thành fragmented MP4,
+# các fragment gần nhất được giữ trong RAM và dùng chung cho mọi viewer.
+
+import shutil
+import struct
+import subprocess
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+def iter_boxes(data, start=0, end=None):
+    """Duyệt các box MP4 (type, offset nội dung, offset kết thúc) trong data[start:end]."""
+    end = len(data) if end is None else end
+    while start + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[start:start + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[start + 8:start + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - start
+        if size < header:
+            return
+        yield kind, start + header, start + size
+        start += size
+
+
+def is_keyframe_fragment(moof):
+    """True nếu sample đầu tiên của fragment (moof) là keyframe (sync sample)."""
+    for kind, start, end in iter_boxes(moof):
+        if kind != b"moof":
+            continue
+        for kind, tstart, tend in iter_boxes(moof, start, end):
+            if kind != b"traf":
+                continue
+            default_flags = None
+            for kind, bstart, bend in iter_boxes(moof, tstart, tend):
+                flags = struct.unpack(">I", moof[bstart:bstart + 4])[0] & 0xFFFFFF
+                pos = bstart + 4
+
+                if kind == b"tfhd":
+                    pos += 4  # track_ID
+                    for bit, size in ((0x1, 8), (0x2, 4), (0x8, 4), (0x10, 4)):
+                        if flags & bit:
+                            pos += size
+                    if flags & 0x20:
+                        default_flags = struct.unpack(">I", moof[pos:pos + 4])[0]
+
+                elif kind == b"trun":
+                    pos += 4  # sample_count
+                    if flags & 0x1:
+                        pos += 4  # data_offset
+                    if flags & 0x4:
+                        sample_flags = struct.unpack(">I", moof[pos:pos + 4])[0]
+                    elif flags & 0x400:
+                        pos += 4 * bool(flags & 0x100) + 4 * bool(flags & 0x200)
+                        sample_flags = struct.unpack(">I", moof[pos:pos + 4])[0]
+                    elif default_flags is not None:
+                        sample_flags = default_flags
+                    else:
+                        return True
+                    # sample_is_non_sync_sample
+                    return not sample_flags & 0x10000
+    return False
+
+
+class H264Stream:
+    """
+    Encode 1 lần cho mọi viewer: ffmpeg chỉ chạy khi có viewer và dừng sau
+    `idle_timeout` giây không còn ai xem.
+
+    get_frame() -> ảnh BGR mới nhất hoặc None (gọi đều đặn `fps` lần/giây,
+    lặp lại frame cũ nếu camera chậm để giữ nhịp cố định cho encoder).
+    """
+
+    def __init__(self, get_frame, fps=15, width=640, bitrate="600k", gop_seconds=1.0,
+                 fragment_ms=200, buffer_seconds=4.0, idle_timeout=10.0, ffmpeg="ffmpeg"):
+        self.get_frame = get_frame
+        self.fps = fps
+        self.width = width
+        self.bitrate = bitrate
+        self.gop = max(1, int(fps * gop_seconds))
+        self.fragment_ms = fragment_ms
+        self.max_fragments = max(2, int(buffer_seconds * 1000 / fragment_ms))
+        self.idle_timeout = idle_timeout
+        self.ffmpeg = shutil.which(ffmpeg)
+
+        self.generation = 0      # tăng mỗi lần khởi động lại ffmpeg (init segment mới)
+        self.bytes_out = 0
+        self._init = None
+        self._fragments = deque(maxlen=self.max_fragments)  # (index, keyframe, bytes)
+        self._next_index = 0
+        self._viewers = 0
+        self._idle_since = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return self.ffmpeg is not None
+
+    # ------------ VIEWER API ------------ #
+    def open_viewer(self):
+        with self._lock:
+            self._viewers += 1
+            self._idle_since = None
+            if not self._running:
+                self._start()
+
+    def close_viewer(self):
+        with self._lock:
+            self._viewers -= 1
+            if self._viewers == 0:
+                self._idle_since = time.monotonic()
+
+    def alive(self, generation):
+        """False khi encoder của `generation` đã dừng (ffmpeg thoát / idle / khởi động lại)."""
+        with self._lock:
+            return self._running and self.generation == generation
+
+    def init_segment(self):
+        """(generation, ftyp + moov) hoặc (generation, None) nếu chưa có."""
+        with self._lock:
+            return self.generation, self._init
+
+    def fragments_since(self, index):
+        """
+        Fragment có index >= `index`. index None hoặc viewer tụt quá xa (fragment
+        đã bị đẩy khỏi buffer) -> bắt đầu lại từ keyframe mới nhất.
+        """
+        with self._lock:
+            frags = list(self._fragments)
+
+        if not frags:
+            return []
+        if index is None or index < frags[0][0]:
+            keys = [i for i, (_, key, _) in enumerate(frags) if key]
+            return frags[keys[-1]:] if keys else []
+        return [f for f in frags if f[0] >= index]
+
+    # ------------ FFMPEG ------------ #
+    def _start(self):
+        # Gọi khi đang giữ self._lock
+        self._running = True
+        self.generation += 1
+        self._init = None
+        self._fragments.clear()
+        threading.Thread(target=self._feed_loop, args=(self.generation,), daemon=True).start()
+
+    def _command(self, w, h):
+        bitrate = self.bitrate
+        return [
+            self.ffmpeg, "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{w}x{h}", "-r", str(self.fps),
+            "-i", "pipe:0", "-an",
+            "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+            "-pix_fmt", "yuv420p", "-g", str(self.gop), "-keyint_min", str(self.gop),
+            "-b:v", bitrate, "-maxrate", bitrate, "-bufsize", bitrate,
+            "-f", "mp4", "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            "-frag_duration", str(self.fragment_ms * 1000),
+            "pipe:1",
+        ]
+
+    def _feed_loop(self, generation):
+        size = None
+        proc = None
+        interval = 1.0 / self.fps
+        next_time = time.monotonic()
+        try:
+            while True:
+                with self._lock:
+                    idle = self._idle_since is not None and \
+                        time.monotonic() - self._idle_since >= self.idle_timeout
+                    if idle:
+                        self._running = False
+                        return
+
+                frame = self.get_frame()
+                if frame is not None:
+                    if size is None:
+                        h, w = frame.shape[:2]
+                        tw = min(self.width, w) // 2 * 2
+                        size = (tw, (h * tw // w) // 2 * 2)  # yuv420p cần kích thước chẵn
+                        proc = subprocess.Popen(self._command(*size), stdin=subprocess.PIPE,
+                                                stdout=subprocess.PIPE)
+                        threading.Thread(target=self._read_loop, args=(proc, generation),
+                                         daemon=True).start()
+                        print(f"🎞️ H.264 stream {size[0]}x{size[1]}@{self.fps:g}")
+
+                    if frame.shape[1] != size[0] or frame.shape[0] != size[1]:
+                        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                    proc.stdin.write(frame.tobytes())
+
+                next_time += interval
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.monotonic()
+        except OSError as e:  # ffmpeg thoát / lỗi pipe
+            print("⚠️ H.264 encoder dừng:", e)
+        finally:
+            with self._lock:
+                if generation == self.generation:
+                    self._running = False
+            if proc is not None:
+                try:
+                    proc.stdin.close()
+                except OSError:  # BrokenPipeError khi ffmpeg đã thoát
+                    pass
+                proc.terminate()
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+
+    def _read_loop(self, proc, generation):
+        out = proc.stdout
+        init = b""
+        moof = None
+        while True:
+            header = out.read(8)
+            if len(header) < 8:
+                return
+            size, kind = struct.unpack(">I4s", header)
+            if size == 1:
+                large = out.read(8)
+                header += large
+                size = struct.unpack(">Q", large)[0]
+            box = header + out.read(size - len(header))
+
+            with self._lock:
+                if generation != self.generation:
+                    return
+                self.bytes_out += len(box)
+
+                if kind in (b"ftyp", b"moov"):
+                    init += box
+                    if kind == b"moov":
+                        self._init = init
+                elif kind == b"moof":
+                    moof = box
+                elif kind == b"mdat" and moof is not None:
+                    self._fragments.append((self._next_index, is_keyframe_fragment(moof), moof + box))
+                    self._next_index += 1
+                    moof = None
@@ -0,0 +1,48 @@
+# video/motion.py
+
+import cv2
+
+
+class MotionDetector:
+    """
+    Phát hiện chuyển động bằng frame differencing (ảnh xám + blur).
+    update() trả về list box (x, y, w, h) của vùng chuyển động > min_area.
+
+    scale > 1: so sánh trên ảnh thu nhỏ 1/scale (ít băng thông bộ nhớ hơn),
+    box và min_area vẫn tính theo tọa độ frame gốc.
+    """
+
+    def __init__(self, diff_threshold=25, min_area=800, blur=21, scale=1):
+        self.diff_threshold = diff_threshold
+        self.min_area = min_area
+        self.blur = blur
+        self.scale = scale
+        self.last_gray = None
+
+    def update(self, frame):
+        if self.scale > 1:
+            # Thu nhỏ ảnh màu trước để cvtColor / blur chạy trên ít pixel hơn
+            frame = cv2.resize(frame, None, fx=1 / self.scale, fy=1 / self.scale,
+                               interpolation=cv2.INTER_AREA)
+        return self.update_gray(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+    def update_gray(self, gray):
+        """Như update() nhưng nhận sẵn ảnh xám đã thu nhỏ 1/scale (vd giải mã từ JPEG)."""
+        s = self.scale
+        blur = max(3, (self.blur // s) | 1)
+        gray = cv2.GaussianBlur(gray, (blur, blur), 0)
+        boxes = []
+
+        if self.last_gray is not None and self.last_gray.shape == gray.shape:
+            diff = cv2.absdiff(self.last_gray, gray)
+            thresh = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)[1]
+            thresh = cv2.dilate(thresh, None, iterations=2)
+            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+            for c in contours:
+                if cv2.contourArea(c) * s * s > self.min_area:
+                    x, y, w, h = cv2.boundingRect(c)
+                    boxes.append((int(x * s), int(y * s), int(w * s), int(h * s)))
+
+        self.last_gray = gray
+        return boxes
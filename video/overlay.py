@@ -0,0 +1,48 @@
+# video/overlay.py
+
+from dataclasses import dataclass
+
+import cv2
+
+
+@dataclass(frozen=True)
+class Overlay:
+    """
+    Kết quả phân tích của 1 frame (box motion / pet, nhãn), giữ tách khỏi ảnh.
+    Chỉ vẽ khi encode cho viewer -> frame cho YOLO / clip luôn sạch.
+    """
+
+    motion: tuple = ()      # (x, y, w, h)
+    pets: tuple = ()        # (label, conf, (x1, y1, x2, y2))
+    label: str = "Khong thay"
+    conf: float = 0.0
+
+    def to_dict(self):
+        return {
+            "motion": [list(box) for box in self.motion],
+            "pets": [{"label": label, "conf": round(conf, 3), "box": list(box)}
+                     for label, conf, box in self.pets],
+            "label": self.label,
+            "conf": round(self.conf, 3),
+        }
+
+    def draw(self, frame):
+        """Vẽ trực tiếp lên `frame` (truyền vào bản copy), trả về frame."""
+        for x, y, w, h in self.motion:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+        for label, conf, (x1, y1, x2, y2) in self.pets:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 200, 255), 2)
+            cv2.putText(frame, f"{label} {conf:.2f}",
+                        (x1, y1 - 5),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        0.7, (0, 255, 255), 2)
+
+        cv2.putText(
+            frame,
+            f"Pet: {self.label} ({self.conf:.2f})",
+            (10, 30),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.7, (255, 200, 0), 2
+        )
+        return frame
@@ -0,0 +1,74 @@
+# video/preroll.py
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class PrerollBuffer:
+    """
+    Ring buffer giữ N giây frame gần nhất dưới dạng JPEG (giới hạn bộ nhớ).
+
+    Khi có trigger (PIR / motion), flush() trả về các frame trước thời điểm
+    trigger để đưa vào detector và clip writer -> clip có pre-roll.
+    """
+
+    def __init__(self, seconds=3.0, max_frames=120, quality=70, encoder=None):
+        self.seconds = float(seconds)
+        self.quality = int(quality)
+        self.encoder = encoder  # callable(frame, quality) -> bytes, mặc định OpenCV
+        self._frames = deque(maxlen=max_frames)  # (ts, jpeg bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def push_jpeg(self, jpeg, ts=None):
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            if len(self._frames) == self._frames.maxlen:
+                self._bytes -= len(self._frames[0][1])
+            self._frames.append((ts, jpeg))
+            self._bytes += len(jpeg)
+
+            # Bỏ các frame cũ hơn cửa sổ pre-roll
+            while self._frames and ts - self._frames[0][0] > self.seconds:
+                self._bytes -= len(self._frames.popleft()[1])
+
+    def push(self, frame, ts=None):
+        if self.encoder is not None:
+            jpeg = self.encoder(frame, self.quality)
+        else:
+            ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            jpeg = buffer.tobytes() if ok else None
+
+        if jpeg is not None:
+            self.push_jpeg(jpeg, ts)
+
+    def flush(self):
+        """Trả về tuple (ts, jpeg) theo thứ tự thời gian, không xóa buffer."""
+        with self._lock:
+            return tuple(self._frames)
+
+    def memory_bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._frames)
+
+
+def sample_frames(preroll, count):
+    """Giải mã `count` frame trải đều trong pre-roll (cho detector)."""
+    if not preroll or count <= 0:
+        return []
+
+    step = max(1, len(preroll) // count)
+    picked = list(preroll[::-1][::step][:count])[::-1]
+
+    frames = []
+    for ts, jpeg in picked:
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        if frame is not None:
+            frames.append((ts, frame))
+    return frames
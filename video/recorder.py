@@ -0,0 +1,289 @@
+# video/recorder.py
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from event_bus import TriggerEvent, MotionEvent, PetEvent
+
+
+# ===============================
+# SEGMENT INDEX (index.jsonl)
+# ===============================
+class ClipIndex:
+    """
+    Index các segment đã ghi, mỗi dòng JSON trong `<clip_dir>/index.jsonl`:
+        {"clip_id", "segment", "file", "start", "end", "trigger", "tracks", "closed"}
+    Segment được ghi 1 dòng khi mở (closed=false) và 1 dòng khi đóng; dòng sau
+    thay dòng trước cùng (clip_id, segment). Crash giữa chừng vẫn còn dòng mở
+    trỏ tới file mp4. Giữ bản sao trong RAM để API /clips không phải đọc file.
+    """
+
+    def __init__(self, clip_dir):
+        self.path = os.path.join(clip_dir, "index.jsonl")
+        self._segments = {}   # (clip_id, segment) -> dòng index, theo thứ tự ghi
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with self._lock, open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    seg = json.loads(line)
+                except ValueError:
+                    continue
+                self._segments[seg["clip_id"], seg["segment"]] = seg
+
+    def append(self, segment):
+        """Ghi thêm 1 dòng; trùng (clip_id, segment) thì thay bản trong RAM."""
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(segment, ensure_ascii=False) + "\n")
+            self._segments[segment["clip_id"], segment["segment"]] = segment
+
+    def clips(self, since=None, until=None, limit=100):
+        """Gộp segment theo clip_id, mới nhất trước."""
+        with self._lock:
+            segments = list(self._segments.values())
+
+        clips = {}
+        for seg in segments:
+            if since is not None and seg["end"] < since:
+                continue
+            if until is not None and seg["start"] > until:
+                continue
+
+            clip = clips.setdefault(seg["clip_id"], {
+                "clip_id": seg["clip_id"],
+                "trigger": seg["trigger"],
+                "start": seg["start"],
+                "end": seg["end"],
+                "segments": 0,
+                "labels": [],
+            })
+            clip["start"] = min(clip["start"], seg["start"])
+            clip["end"] = max(clip["end"], seg["end"])
+            clip["segments"] += 1
+            for track in seg["tracks"]:
+                if track["label"] not in clip["labels"]:
+                    clip["labels"].append(track["label"])
+
+        result = sorted(clips.values(), key=lambda c: c["start"], reverse=True)
+        return result[:max(1, limit)]
+
+    def segments(self, clip_id):
+        with self._lock:
+            return sorted((s for s in self._segments.values() if s["clip_id"] == clip_id),
+                          key=lambda s: s["segment"])
+
+    def seek(self, clip_id, t):
+        """Tìm segment chứa thời điểm t, trả về (segment, offset giây) hoặc None."""
+        for seg in self.segments(clip_id):
+            if seg["start"] <= t <= seg["end"]:
+                return seg, t - seg["start"]
+        return None
+
+
+# ===============================
+# CLIP RECORDER
+# ===============================
+class ClipRecorder:
+    """
+    Ghi clip theo sự kiện (PIR / motion / pet) trong thread riêng.
+
+    - Bắt đầu khi nhận TriggerEvent, ghi luôn các frame pre-roll.
+    - Kéo dài clip khi còn motion / pet, dừng sau `post_seconds` yên tĩnh
+      hoặc khi đạt `max_seconds`. MotionEvent chỉ được gửi khi motion bắt đầu /
+      dừng nên recorder tự giữ trạng thái: thời gian yên tĩnh tính từ lúc dừng.
+    - Chia thành các file segment `segment_seconds` giây, mỗi segment có 1
+      dòng trong index (thời gian, trigger, tracks của pet).
+    """
+
+    def __init__(self, bus, clip_dir="clips", fps=10, segment_seconds=10,
+                 post_seconds=5, max_seconds=120, fourcc="avc1"):
+        self.clip_dir = clip_dir
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.post_seconds = post_seconds
+        self.max_seconds = max_seconds
+        self.fourcc = fourcc
+
+        os.makedirs(clip_dir, exist_ok=True)
+        self.index = ClipIndex(clip_dir)
+        self.index.load()
+
+        self._sub = bus.subscribe(TriggerEvent, MotionEvent, PetEvent, maxsize=64)
+        self._frames = deque(maxlen=self.fps * 4)  # (ts, frame) chờ ghi
+        self._wake = threading.Event()
+
+        self._clip = None      # thông tin clip đang ghi
+        self._moving = False   # theo MotionEvent cuối cùng (có box = đang chuyển động)
+        self._segment = None   # segment đang ghi
+        self._writer = None
+
+    @property
+    def recording(self):
+        return self._clip is not None
+
+    def submit(self, frame, ts=None):
+        """Gọi từ camera_loop; frame là ảnh BGR hoặc JPEG bytes. Chỉ nhận khi đang ghi clip."""
+        if self._clip is None:
+            return
+        self._frames.append((time.time() if ts is None else ts, frame))
+        self._wake.set()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    # ------------ LOOP ------------ #
+    def _run(self):
+        while True:
+            self._wake.wait(0.1)
+            self._wake.clear()
+
+            for event in self._sub.drain():
+                self._handle_event(event)
+
+            while self._frames:
+                ts, frame = self._frames.popleft()
+                if self._clip is None:
+                    continue
+                if isinstance(frame, bytes):  # JPEG từ camera MJPEG
+                    frame = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+                if frame is not None:
+                    self._write(frame, ts)
+
+            if self._clip is not None:
+                now = time.time()
+                quiet = not self._moving and now - self._clip["last_activity"] >= self.post_seconds
+                too_long = now - self._clip["start"] >= self.max_seconds
+                if quiet or too_long:
+                    self._close_clip()
+
+    def _handle_event(self, event):
+        if isinstance(event, MotionEvent):
+            # Cập nhật cả khi chưa ghi: clip có thể mở giữa lúc đang chuyển động
+            self._moving = bool(event.boxes)
+            if self._clip is not None:
+                self._clip["last_activity"] = event.ts
+            return
+
+        if isinstance(event, TriggerEvent):
+            if self._clip is None:
+                self._open_clip(event)
+            else:
+                self._clip["last_activity"] = event.ts
+
+        elif self._clip is None:
+            return
+
+        elif isinstance(event, PetEvent):
+            self._clip["last_activity"] = event.ts
+            self._clip["tracks"].append({
+                "ts": event.ts, "label": event.label,
+                "conf": round(event.conf, 3), "box": list(event.box),
+            })
+
+    # ------------ CLIP / SEGMENT ------------ #
+    def _open_clip(self, event):
+        start = event.preroll[0][0] if event.preroll else event.ts
+        self._clip = {
+            "id": datetime.fromtimestamp(start).strftime("%Y%m%d_%H%M%S"),
+            "trigger": event.source,
+            "start": start,
+            "last_activity": event.ts,
+            "segment": 0,
+            "tracks": [],
+        }
+        print(f"🎬 Clip {self._clip['id']} bắt đầu ({event.source})")
+
+        for ts, jpeg in event.preroll:
+            frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                self._write(frame, ts)
+
+    def _open_writer(self, path, size):
+        for fourcc in (self.fourcc, "mp4v"):
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), self.fps, size)
+            if writer.isOpened():
+                return writer
+            writer.release()
+        return None
+
+    def _open_segment(self, frame, ts):
+        day = datetime.fromtimestamp(ts).strftime("%Y%m%d")
+        os.makedirs(os.path.join(self.clip_dir, day), exist_ok=True)
+
+        name = f"{day}/clip_{self._clip['id']}_{self._clip['segment']:03d}.mp4"
+        h, w = frame.shape[:2]
+        self._writer = self._open_writer(os.path.join(self.clip_dir, name), (w, h))
+        self._segment = {"file": name, "start": ts, "written": 0, "entry": None}
+
+        if self._writer is None:
+            print(f"❌ Không mở được VideoWriter cho {name}")
+            return
+
+        # Ghi index ngay khi mở: /clips thấy segment đang ghi, crash không mồ côi file
+        self._segment["entry"] = self._index_entry(closed=False)
+        self.index.append(self._segment["entry"])
+
+    def _index_entry(self, closed):
+        seg = self._segment
+        end = seg["start"] + seg["written"] / self.fps
+        return {
+            "clip_id": self._clip["id"],
+            "segment": self._clip["segment"],
+            "file": seg["file"],
+            "start": seg["start"],
+            "end": end,
+            "trigger": self._clip["trigger"],
+            "tracks": [t for t in self._clip["tracks"] if seg["start"] <= t["ts"] <= end],
+            "closed": closed,
+        }
+
+    def _close_segment(self):
+        if self._segment is None:
+            return
+
+        if self._writer is not None:
+            self._writer.release()
+            self.index.append(self._index_entry(closed=True))
+
+        self._writer = None
+        self._segment = None
+        self._clip["segment"] += 1
+
+    def _close_clip(self):
+        self._close_segment()
+        print(f"🎬 Clip {self._clip['id']} kết thúc")
+        self._clip = None
+        self._frames.clear()
+
+    def _write(self, frame, ts):
+        if self._segment is not None and ts - self._segment["start"] >= self.segment_seconds:
+            self._close_segment()
+
+        if self._segment is None:
+            self._open_segment(frame, ts)
+
+        seg = self._segment
+        if self._writer is None:
+            return
+
+        # Ghi theo timestamp để thời gian trong file khớp thời gian thực:
+        # lặp frame khi camera chậm, bỏ frame khi camera nhanh hơn fps ghi
+        target = int((ts - seg["start"]) * self.fps) + 1
+        target = min(target, seg["written"] + self.fps * 2)
+        while seg["written"] < target:
+            self._writer.write(frame)
+            seg["written"] += 1
+        # Chỉ cập nhật bản trong RAM; file index ghi lại khi đóng segment
+        seg["entry"]["end"] = seg["start"] + seg["written"] / self.fps
@@ -0,0 +1,281 @@
+# video/sources.py
+
+import math
+import os
+import time
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+import numpy as np
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_sensor_script(path):
+    """
+    Kịch bản PIR/RFID cho replay, mỗi dòng: `<giây> <dòng giao thức serial>`
+        0.0  PIR:1
+        4.5  RFID:VAN_CAT_001
+        9.0  PIR:0
+    Trả về list (offset, line) đã sắp xếp.
+    """
+    script = []
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            raw = raw.split("#", 1)[0].strip()
+            if not raw:
+                continue
+            offset, line = raw.split(None, 1)
+            script.append((float(offset), line.strip()))
+    return sorted(script)
+
+
+class ReplaySource:
+    """
+    Nguồn frame thay cho cv2.VideoCapture: phát lại file video hoặc thư mục ảnh.
+
+    - realtime=False: đọc nhanh nhất có thể (benchmark)
+    - realtime=True: giữ đúng nhịp fps của video
+    - script + on_line: bắn các dòng PIR/RFID theo thời gian trong video
+    API giống VideoCapture (isOpened / read / set / get / release) để
+    camera_loop() dùng nguyên vẹn.
+    """
+
+    def __init__(self, path, realtime=False, loop=False, fps=None,
+                 script=None, on_line=None):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.script = list(script or [])
+        self.on_line = on_line
+
+        self.frame_index = 0
+        self.finished = False
+
+        self._files = None
+        self._cap = None
+        self._script_pos = 0
+        self._start = None
+
+        if os.path.isdir(path):
+            self._files = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(IMAGE_EXTS))
+            self.fps = fps or 30.0
+        else:
+            self._cap = cv2.VideoCapture(path)
+            self.fps = fps or self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    # ------------ VideoCapture API ------------ #
+    def isOpened(self):
+        if self._files is not None:
+            return len(self._files) > 0
+        return self._cap is not None and self._cap.isOpened()
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.frame_index
+        return self._cap.get(prop) if self._cap is not None else 0
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+
+    def read(self):
+        if self.finished:
+            return False, None
+
+        ret, frame = self._next_frame()
+        if not ret and self.loop and self.frame_index > 0:
+            self._rewind()
+            ret, frame = self._next_frame()
+
+        if not ret:
+            self.finished = True
+            return False, None
+
+        video_time = self.frame_index / self.fps
+        self.frame_index += 1
+        self._fire_script(video_time)
+
+        if self.realtime:
+            if self._start is None:
+                self._start = time.monotonic() - video_time
+            delay = self._start + video_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        return True, frame
+
+    # ------------ INTERNAL ------------ #
+    def _next_frame(self):
+        if self._files is not None:
+            i = self.frame_index % len(self._files) if self.loop else self.frame_index
+            if i >= len(self._files):
+                return False, None
+            frame = cv2.imread(self._files[i])
+            return frame is not None, frame
+
+        return self._cap.read()
+
+    def _rewind(self):
+        if self._cap is not None:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _fire_script(self, video_time):
+        if self.on_line is None or not self.script:
+            return
+
+        while self._script_pos < len(self.script) and self.script[self._script_pos][0] <= video_time:
+            self.on_line(self.script[self._script_pos][1])
+            self._script_pos += 1
+
+
+class SyntheticSource:
+    """
+    Nguồn video tổng hợp, tất định theo `seed` (không cần camera / pet thật):
+    vài hình khối chuyển động nảy trong khung, ánh sáng dao động chậm và nhiễu.
+    set(CAP_PROP_CONVERT_RGB, 0) -> read() trả về JPEG như webcam MJPEG.
+
+    Vị trí mỗi hình tính trực tiếp từ chỉ số frame nên cùng seed luôn cho
+    cùng chuỗi frame, bất kể tốc độ đọc.
+    """
+
+    NOISE_FRAMES = 8
+
+    def __init__(self, width=640, height=480, fps=30.0, shapes=3, noise=6,
+                 drift=0.15, seed=0, realtime=False, max_frames=None, mjpeg=False):
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+        self.realtime = realtime
+        self.max_frames = max_frames
+        self.drift = drift
+        self.mjpeg = mjpeg
+
+        self.frame_index = 0
+        self.finished = False
+        self._start = None
+
+        rng = np.random.default_rng(seed)
+
+        # Nền gradient cố định
+        ramp = np.linspace(60, 140, self.width, dtype=np.float32)
+        background = np.repeat(ramp[None, :], self.height, axis=0)
+        self._background = cv2.merge([background, background * 0.9, background * 0.8])
+
+        # Nhiễu tính trước, dùng xoay vòng cho rẻ
+        self._noise = [
+            rng.normal(0, noise, (self.height, self.width, 3)).astype(np.int16)
+            for _ in range(self.NOISE_FRAMES)
+        ] if noise else None
+
+        size = min(self.width, self.height)
+        self._shapes = []
+        for i in range(shapes):
+            self._shapes.append({
+                "kind": "circle" if i % 2 else "rect",
+                "r": int(size * rng.uniform(0.05, 0.12)),
+                "x0": rng.uniform(0, 1), "y0": rng.uniform(0, 1),
+                "vx": rng.uniform(0.2, 0.8), "vy": rng.uniform(0.2, 0.8),
+                # Sáng / tối xen kẽ để tương phản với nền xám
+                "color": tuple(int(c) for c in (rng.integers(190, 256, 3) if i % 2 == 0
+                                                else rng.integers(0, 40, 3))),
+            })
+
+    # ------------ VideoCapture API ------------ #
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_CONVERT_RGB:
+            self.mjpeg = not value
+            return True
+        return prop == cv2.CAP_PROP_FOURCC
+
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+            cv2.CAP_PROP_POS_FRAMES: self.frame_index,
+        }.get(prop, 0)
+
+    def release(self):
+        pass
+
+    def read(self):
+        if self.max_frames is not None and self.frame_index >= self.max_frames:
+            self.finished = True
+            return False, None
+
+        t = self.frame_index / self.fps
+        frame = self.render(self.frame_index)
+        if self.mjpeg:
+            ok, frame = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+            frame = frame.reshape(-1)
+        self.frame_index += 1
+
+        if self.realtime:
+            if self._start is None:
+                self._start = time.monotonic() - t
+            delay = self._start + t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        return True, frame
+
+    # ------------ RENDER ------------ #
+    @staticmethod
+    def _bounce(p0, v, t):
+        # Sóng tam giác 0..1: vị trí nảy qua lại giữa 2 biên
+        p = (p0 + v * t) % 2.0
+        return 2.0 - p if p > 1.0 else p
+
+    def render(self, index):
+        t = index / self.fps
+        gain = 1.0 + self.drift * math.sin(2 * math.pi * t / 20.0)
+        frame = cv2.convertScaleAbs(self._background, alpha=gain)
+
+        for shape in self._shapes:
+            r = shape["r"]
+            x = int(r + self._bounce(shape["x0"], shape["vx"], t) * (self.width - 2 * r))
+            y = int(r + self._bounce(shape["y0"], shape["vy"], t) * (self.height - 2 * r))
+            if shape["kind"] == "circle":
+                cv2.circle(frame, (x, y), r, shape["color"], -1)
+            else:
+                cv2.rectangle(frame, (x - r, y - r), (x + r, y + r), shape["color"], -1)
+
+        if self._noise is not None:
+            noise = self._noise[index % self.NOISE_FRAMES]
+            frame = cv2.add(frame, noise, dtype=cv2.CV_8U)
+
+        return frame
+
+
+def open_source(spec, realtime=False, loop=False, **kwargs):
+    """
+    Mở nguồn frame theo chuỗi cấu hình:
+        synthetic://1920x1080@30?shapes=4&noise=6&seed=1
+        synthetic://640x480@30?mjpeg=1   (giả lập webcam MJPEG)
+        /path/to/video.mp4  hoặc  /path/to/frames/
+    """
+    if spec.startswith("synthetic://"):
+        url = urlparse(spec)
+        size, _, fps = url.netloc.partition("@")
+        width, _, height = size.partition("x")
+        params = {k: float(v[0]) for k, v in parse_qs(url.query).items()}
+
+        return SyntheticSource(
+            width=int(width or 640), height=int(height or 480),
+            fps=float(fps or 30), realtime=realtime,
+            shapes=int(params.get("shapes", 3)), noise=params.get("noise", 6),
+            drift=params.get("drift", 0.15), seed=int(params.get("seed", 0)),
+            mjpeg=bool(params.get("mjpeg", 0)), **kwargs)
+
+    return ReplaySource(spec, realtime=realtime, loop=loop, **kwargs)
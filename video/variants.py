@@ -0,0 +1,191 @@
+# video/variants.py
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+import cv2
+
+QUALITY_STEP = 10   # làm tròn quality để các client dùng chung variant
+WIDTH_STEP = 80     # làm tròn chiều rộng (px)
+MIN_QUALITY = 30
+MIN_WIDTH = 160
+
+
+def quantize(quality, width, frame_width):
+    """Chuẩn hóa (q, w) yêu cầu về 1 trong số ít variant; None = mặc định."""
+    if quality is not None:
+        quality = int(round(quality / QUALITY_STEP) * QUALITY_STEP)
+        quality = max(MIN_QUALITY, min(95, quality))
+
+    if width is not None:
+        width = int(round(width / WIDTH_STEP) * WIDTH_STEP)
+        width = max(MIN_WIDTH, width)
+        if width >= frame_width:
+            width = None
+
+    return quality, width
+
+
+def encode_jpeg(frame, quality=None):
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if quality is not None else []
+    ok, buffer = cv2.imencode(".jpg", frame, params)
+    return buffer.tobytes() if ok else None
+
+
+class VariantCache:
+    """
+    Cache JPEG đã encode của frame mới nhất theo từng variant (quality, width).
+
+    Mỗi variant chỉ encode 1 lần cho mỗi frame (seq), dùng chung cho mọi client
+    cùng yêu cầu. Giữ tối đa `max_variants` variant (LRU). `overlay` đánh dấu
+    frame có vẽ overlay hay không (ảnh sạch và ảnh có box là 2 variant khác nhau).
+    """
+
+    def __init__(self, max_variants=8, encoder=encode_jpeg, on_encode=None):
+        self.max_variants = max_variants
+        self.encoder = encoder
+        self.on_encode = on_encode  # callback(giây) cho metrics
+        self._entries = OrderedDict()  # (q, w, overlay) -> [seq, jpeg, ts]
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _variant_lock(self, key):
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def get(self, frame, seq, ts, quality=None, width=None, overlay=False):
+        key = (quality, width, overlay)
+
+        # Khóa riêng từng variant: encode 320px không phải chờ encode 640px
+        with self._variant_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    if entry[0] == seq:
+                        return entry[1], entry[2]
+
+            t0 = time.perf_counter()
+            # frame có thể là hàm trả về ảnh (giải mã lười từ JPEG camera)
+            src = frame = frame() if callable(frame) else frame
+            if src is None:
+                return None
+            if width is not None:
+                h, w = frame.shape[:2]
+                src = cv2.resize(frame, (width, max(1, h * width // w)), interpolation=cv2.INTER_AREA)
+            jpeg = self.encoder(src, quality)
+            if self.on_encode is not None:
+                self.on_encode(time.perf_counter() - t0)
+            if jpeg is None:
+                return None
+
+            with self._lock:
+                self._entries[key] = [seq, jpeg, ts]
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_variants:
+                    old, _ = self._entries.popitem(last=False)
+                    self._locks.pop(old, None)
+
+            return jpeg, ts
+
+
+class AdaptiveRate:
+    """
+    Điều chỉnh chất lượng stream cho từng client theo tốc độ ghi socket.
+
+    level 0 = chất lượng client yêu cầu; mỗi level giảm quality và chiều rộng.
+    Khi thời gian ghi 1 frame (EMA) vượt `slow_ratio` khung thời gian của
+    frame -> hạ 1 level; nhanh ổn định `recover_after` giây -> nâng 1 level.
+    """
+
+    def __init__(self, quality, width, frame_width, fps=None, max_level=3,
+                 slow_ratio=0.5, fast_ratio=0.1, cooldown=2.0, recover_after=5.0):
+        self.base_quality = quality if quality is not None else 80
+        self.base_width = width if width is not None else frame_width
+        self.frame_width = frame_width
+        self.requested = (quality, width)
+        self.budget = 1.0 / fps if fps else 1.0 / 15
+        self.max_level = max_level
+        self.slow_ratio = slow_ratio
+        self.fast_ratio = fast_ratio
+        self.cooldown = cooldown
+        self.recover_after = recover_after
+
+        self.level = 0
+        self.downshifts = 0
+        self._ema = 0.0
+        self._changed = 0.0
+        self._fast_since = None
+
+    def variant(self):
+        if self.level == 0:
+            return quantize(*self.requested, self.frame_width)
+
+        quality = self.base_quality - 15 * self.level
+        width = self.base_width * 0.75 ** self.level
+        return quantize(quality, width, self.frame_width)
+
+    def record(self, send_seconds, now=None):
+        """Ghi nhận thời gian ghi 1 frame; trả về True nếu level thay đổi."""
+        now = time.monotonic() if now is None else now
+        self._ema = 0.7 * self._ema + 0.3 * send_seconds
+
+        if now - self._changed < self.cooldown:
+            return False
+
+        if self._ema > self.slow_ratio * self.budget and self.level < self.max_level:
+            self.level += 1
+            self.downshifts += 1
+            self._changed = now
+            self._fast_since = None
+            return True
+
+        if self._ema < self.fast_ratio * self.budget and self.level > 0:
+            if self._fast_since is None:
+                self._fast_since = now
+            elif now - self._fast_since >= self.recover_after:
+                self.level -= 1
+                self._changed = now
+                self._fast_since = None
+                return True
+        else:
+            self._fast_since = None
+
+        return False
+
+
+class AckRate(AdaptiveRate):
+    """
+    AdaptiveRate cho /ws/video, nơi tín hiệu là thời gian gửi -> ack chứ không
+    phải thời gian ghi socket. Thời gian ack luôn gồm 1 RTT + thời gian client
+    giải mã, nên chỉ phần vượt trên mức nền (min trong `window` giây gần nhất)
+    mới được coi là nghẽn. Ngưỡng nới hơn AdaptiveRate vì jitter mạng.
+    """
+
+    def __init__(self, quality, width, frame_width, fps=None, window=10.0,
+                 slow_ratio=0.75, fast_ratio=0.25, **kwargs):
+        super().__init__(quality, width, frame_width, fps=fps,
+                         slow_ratio=slow_ratio, fast_ratio=fast_ratio, **kwargs)
+        self.window = window
+        self._samples = deque()  # (thời điểm, ack_seconds), tăng dần theo ack_seconds
+
+    @property
+    def base_rtt(self):
+        return self._samples[0][1] if self._samples else 0.0
+
+    def record_ack(self, ack_seconds, now=None):
+        """Ghi nhận thời gian gửi -> ack của 1 frame; trả về True nếu level thay đổi."""
+        now = time.monotonic() if now is None else now
+
+        # Min trượt theo thời gian (monotonic deque)
+        while self._samples and self._samples[-1][1] >= ack_seconds:
+            self._samples.pop()
+        self._samples.append((now, ack_seconds))
+        while now - self._samples[0][0] > self.window:
+            self._samples.popleft()
+
+        return self.record(ack_seconds - self.base_rtt, now)